@@ -0,0 +1,169 @@
+"""
+End-to-end latency of the analysis pipeline against local ASR and OpenAI stand-ins.
+
+Each run saves a fresh recording with recording.save_audio_file, transcribes it with
+gpt_query.transcribe_audio and streams the answer with gpt_query.stream_answer
+(generate_answer with --no-stream). It reports p50 and p95 of:
+
+- stop_to_transcript: from the end of the recording to the transcript
+- transcript_to_first_token: from the transcript to the first answer token
+- total: from the end of the recording to the full answer
+
+Results are written to a JSON file, pass an earlier one with --compare to see the change.
+
+Usage:
+    python -m benchmarks.end_to_end [--runs N] [--output results.json] [--compare old.json]
+"""
+import argparse
+import atexit
+import dataclasses
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.fake_servers import FakeLatency, fake_asr_server, fake_openai_server
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS = ("stop_to_transcript", "transcript_to_first_token", "total")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile.
+    """
+    ordered: List[float] = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def summarize(runs: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        metric: {
+            "p50": percentile([run[metric] for run in runs], 50),
+            "p95": percentile([run[metric] for run in runs], 95),
+        }
+        for metric in METRICS
+    }
+
+
+def synthetic_recording(seconds: float, samplerate: int, seed: int) -> np.ndarray:
+    """
+    Speech-like audio: a noisy tone with pauses, different per seed so that
+    the transcription cache never hits.
+    """
+    rng = np.random.default_rng(seed)
+    t: np.ndarray = np.arange(int(seconds * samplerate)) / samplerate
+    envelope: np.ndarray = (np.sin(2 * np.pi * 0.7 * t) > -0.3).astype(np.float32)
+    tone: np.ndarray = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(len(t))
+    return (tone * envelope).astype(np.float32)[:, None].repeat(2, axis=1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_pipeline(args: argparse.Namespace) -> List[Dict[str, float]]:
+    # Imported once the servers are up, the modules read their URLs at import
+    from src import gpt_query
+    from src.recording import save_audio_file
+    from src.config import SAMPLE_RATE
+
+    runs: List[Dict[str, float]] = []
+    for i in range(args.warmup + args.runs):
+        recording: np.ndarray = synthetic_recording(args.audio_seconds, SAMPLE_RATE, seed=i)
+        stop: float = time.perf_counter()
+        save_audio_file(recording)
+        transcript: str = gpt_query.transcribe_audio()
+        transcribed: float = time.perf_counter()
+
+        options: Dict[str, Any] = dict(short_answer=False, model=args.model, use_cache=False)
+        first_token: float = 0.0
+        if args.no_stream:
+            gpt_query.generate_answer(transcript, **options)
+        else:
+            for _ in gpt_query.stream_answer(transcript, **options):
+                first_token = first_token or time.perf_counter()
+        done: float = time.perf_counter()
+
+        if i >= args.warmup:
+            runs.append({
+                "stop_to_transcript": transcribed - stop,
+                "transcript_to_first_token": (first_token or done) - transcribed,
+                "total": done - stop,
+            })
+    return runs
+
+
+def print_report(summary: Dict[str, Dict[str, float]], baseline: Dict[str, Any]) -> None:
+    print(f"{'metric':<28}{'p50, ms':>10}{'p95, ms':>10}{'Δp50':>9}{'Δp95':>9}")
+    for metric, stats in summary.items():
+        line: str = f"{metric:<28}{stats['p50'] * 1000:>10.0f}{stats['p95'] * 1000:>10.0f}"
+        old: Dict[str, float] = baseline.get("summary", {}).get(metric, {})
+        for q in ("p50", "p95"):
+            if old.get(q):
+                line += f"{(stats[q] / old[q] - 1) * 100:>+8.1f}%"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Measured runs")
+    parser.add_argument("--warmup", type=int, default=2, help="Runs before measuring")
+    parser.add_argument("--audio-seconds", type=float, default=10.0, help="Length of each recording")
+    parser.add_argument("--model", default="gpt-4o-mini", help="Model name sent to the stand-in")
+    parser.add_argument("--no-stream", action="store_true", help="Use generate_answer instead of stream_answer")
+    parser.add_argument("--output", default="benchmarks/results/end_to_end.json", help="JSON results file")
+    parser.add_argument("--compare", help="Earlier JSON results file to compare against")
+    for field in dataclasses.fields(FakeLatency):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=field.type, default=field.default)
+    args = parser.parse_args()
+
+    latency = FakeLatency(**{field.name: getattr(args, field.name) for field in dataclasses.fields(FakeLatency)})
+    output: str = os.path.abspath(args.output)
+    baseline: Dict[str, Any] = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    with fake_asr_server(latency) as asr, fake_openai_server(latency) as llm:
+        os.environ["ASR_BACKEND"] = "http"
+        os.environ["ASR_URL"] = asr.url + "/asr"
+        os.environ["OPENAI_BASE_URL"] = llm.url + "/v1"
+        os.environ["OPENAI_API_KEY"] = "sk-fake"
+
+        # Settings, caches and recordings of the benchmark stay out of the working copy.
+        # The directory is removed after the settings are flushed at exit.
+        sys.path.insert(0, PROJECT_ROOT)
+        workdir: str = tempfile.mkdtemp(prefix="hack-interview-bench-")
+        atexit.register(shutil.rmtree, workdir, True)
+        os.chdir(workdir)
+        runs = run_pipeline(args)
+
+    summary = summarize(runs)
+    print_report(summary, baseline)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {**vars(args), "output": None, "compare": None},
+            "summary": summary,
+            "runs": runs,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
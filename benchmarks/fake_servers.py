@@ -0,0 +1,160 @@
+"""
+Local stand-ins for the ASR server and the OpenAI API with configurable latency.
+
+The ASR server answers POST /asr like whisper-asr-webservice. The OpenAI server answers
+GET /v1/models and POST /v1/chat/completions, streamed or not, at a fixed token rate.
+"""
+import json
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Type
+
+FAKE_TRANSCRIPT = "Розкажіть, будь ласка, що таке похідна функції та який її геометричний зміст?"
+FAKE_MODELS = ["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo", "text-embedding-3-small", "whisper-1"]
+
+
+@dataclass
+class FakeLatency:
+    """
+    Latency of the stand-in servers.
+
+    Attributes:
+        asr_latency (float): Seconds before the ASR server answers.
+        asr_rtf (float): Extra ASR seconds per second of uploaded audio (real-time factor).
+        llm_ttft (float): Seconds before the first token.
+        llm_tokens_per_second (float): Token rate after the first token.
+        answer_tokens (int): Tokens in every answer.
+    """
+
+    asr_latency: float = 0.3
+    asr_rtf: float = 0.05
+    llm_ttft: float = 0.4
+    llm_tokens_per_second: float = 60.0
+    answer_tokens: int = 120
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency: FakeLatency
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        # Connection warm-up, the connection stays open like on the real servers
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data: Dict[str, Any]) -> None:
+        self._send(200, json.dumps(data).encode("utf-8"), "application/json")
+
+
+class _AsrHandler(_Handler):
+    def do_POST(self) -> None:
+        body: bytes = self._body()
+        # Roughly the seconds of 16 kHz 16-bit audio, compressed formats count as less
+        audio_seconds: float = len(body) / 32000
+        time.sleep(self.latency.asr_latency + self.latency.asr_rtf * audio_seconds)
+        self._send(200, FAKE_TRANSCRIPT.encode("utf-8"), "text/plain; charset=utf-8")
+
+
+class _OpenAIHandler(_Handler):
+    def do_GET(self) -> None:
+        self._send_json({"object": "list", "data": [
+            {"id": model, "object": "model", "created": 0, "owned_by": "system"} for model in FAKE_MODELS
+        ]})
+
+    def do_POST(self) -> None:
+        request: Dict[str, Any] = json.loads(self._body() or b"{}")
+        model: str = request.get("model", "gpt-4o-mini")
+        tokens: List[str] = [f"token{i} " for i in range(self.latency.answer_tokens)]
+        usage = {"prompt_tokens": 100, "completion_tokens": len(tokens), "total_tokens": 100 + len(tokens)}
+
+        if not request.get("stream"):
+            time.sleep(self.latency.llm_ttft + len(tokens) / self.latency.llm_tokens_per_second)
+            self._send_json({
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": model,
+                "choices": [{
+                    "index": 0, "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                }],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(self.latency.llm_ttft)
+        include_usage: bool = bool((request.get("stream_options") or {}).get("include_usage"))
+        for event in self._events(model, tokens, usage if include_usage else None):
+            data: bytes = f"data: {event}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _events(self, model: str, tokens: List[str], usage: Any) -> Iterator[str]:
+        chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": model}
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(1 / self.latency.llm_tokens_per_second)
+            yield json.dumps({**chunk, "choices": [
+                {"index": 0, "delta": {"content": token}, "finish_reason": None}
+            ]})
+        yield json.dumps({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if usage:
+            yield json.dumps({**chunk, "choices": [], "usage": usage})
+        yield "[DONE]"
+
+
+class FakeServer:
+    """
+    A stand-in server running in a daemon thread on a free local port.
+    """
+
+    def __init__(self, handler: Type[_Handler], latency: FakeLatency) -> None:
+        handler_class = type(handler.__name__, (handler,), {"latency": latency})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def fake_asr_server(latency: FakeLatency) -> FakeServer:
+    """
+    Create the ASR stand-in, its endpoint is `url + "/asr"`.
+    """
+    return FakeServer(_AsrHandler, latency)
+
+
+def fake_openai_server(latency: FakeLatency) -> FakeServer:
+    """
+    Create the OpenAI stand-in, its base URL is `url + "/v1"`.
+    """
+    return FakeServer(_OpenAIHandler, latency)
@@ -0,0 +1,65 @@
+"""
+Measure application startup: the time to import main, and optionally to show the window,
+and which heavy modules are loaded before the window is shown.
+
+Each run is a fresh interpreter, so nothing is cached in sys.modules.
+
+Usage:
+    python -m benchmarks.startup [--window] [--repeat N]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+# Modules that must not be imported before the window is shown
+HEAVY_MODULES = ("openai", "httpx", "numpy", "sounddevice", "soundfile", "PIL", "src.gpt_query", "src.audio")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+result = {"import": time.perf_counter() - start}
+if %(window)r:
+    from src.gui import initialize_window
+    window = initialize_window()
+    window.read(timeout=0)
+    result["window"] = time.perf_counter() - start
+    window.close()
+result["heavy"] = [name for name in %(heavy)r if name in sys.modules]
+print(json.dumps(result))
+"""
+
+
+def run_once(window: bool) -> Dict[str, Any]:
+    output: str = subprocess.run(
+        [sys.executable, "-c", PROBE % {"window": window, "heavy": HEAVY_MODULES}],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--window", action="store_true", help="Also measure the time to show the window")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters to start")
+    args = parser.parse_args()
+
+    runs: List[Dict[str, Any]] = [run_once(args.window) for _ in range(args.repeat)]
+    for key in ("import", "window"):
+        timings: List[float] = [run[key] for run in runs if key in run]
+        if timings:
+            print(f"{key:<8} median {statistics.median(timings) * 1000:>7.0f} ms, max {max(timings) * 1000:>7.0f} ms")
+
+    heavy: List[str] = runs[-1]["heavy"]
+    print(f"heavy modules loaded at startup: {', '.join(heavy) if heavy else 'none'}")
+    if heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare upload payload size, encoding time and ASR latency of the upload formats.
+
+Usage:
+    python -m benchmarks.upload_encoding [record.wav] [--asr] [--repeat N]
+"""
+import argparse
+import statistics
+import time
+from typing import Any, Callable, List, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from src.config import UPLOAD_SAMPLE_RATE
+from utils.audio_encoding import downmix, encode_audio, resample
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="record.wav", help="Recording to encode")
+    parser.add_argument("--asr", action="store_true", help="Also measure ASR latency (uses ASR_URL)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per measurement")
+    args = parser.parse_args()
+
+    audio_data, samplerate = sf.read(args.path, dtype="float32", always_2d=True)
+    duration: float = len(audio_data) / samplerate
+    print(f"{args.path}: {duration:.1f} s, {samplerate} Hz, {audio_data.shape[1]} channel(s)\n")
+
+    def original() -> Tuple[bytes, str]:
+        return encode_audio(audio_data, samplerate, "wav")
+
+    def compact(upload_format: str) -> Callable[[], Tuple[bytes, str]]:
+        def encode() -> Tuple[bytes, str]:
+            mono: np.ndarray = resample(downmix(audio_data), samplerate, UPLOAD_SAMPLE_RATE)
+            return encode_audio(mono, UPLOAD_SAMPLE_RATE, upload_format)
+
+        return encode
+
+    cases = [
+        (f"wav {samplerate // 1000} kHz, {audio_data.shape[1]} ch", original),
+        ("wav 16 kHz mono", compact("wav")),
+        ("flac 16 kHz mono", compact("flac")),
+        ("opus 16 kHz mono", compact("opus")),
+    ]
+
+    if args.asr:
+        from utils.transcribe import transcribe_audio_bytes
+
+    print(f"{'format':<22}{'size, KB':>10}{'ratio':>8}{'encode, ms':>12}{'asr, ms':>10}")
+    baseline: int = 0
+    for name, func in cases:
+        encode_time, (payload, filename) = measure(func, args.repeat)
+        baseline = baseline or len(payload)
+        asr: str = "-"
+        if args.asr:
+            asr_time, _ = measure(lambda: transcribe_audio_bytes(payload, filename), args.repeat)
+            asr = f"{(encode_time + asr_time) * 1000:.0f}"
+        print(
+            f"{name:<22}{len(payload) / 1024:>10.1f}{baseline / len(payload):>7.1f}x"
+            f"{encode_time * 1000:>12.1f}{asr:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ from loguru import logger
 from src.button import OFF_IMAGE
 from src.config import MODELS
 from src.gui import initialize_window
-from src.handlers import handle_events, screenshot_area
+from src.handlers import handle_events, preload_modules, refresh_expired_models, screenshot_area
 from utils.cache import set_default_position, set_default_model
 
 
@@ -18,6 +18,10 @@ def main() -> None:
     window.TKroot.resizable(True, True)
     logger.debug("Application started.")
 
+    # The window is up, load the rest in the background
+    preload_modules()
+    refresh_expired_models(window)
+
     while True:
         event: str
         values: Dict[str, Any]
@@ -1,12 +1,32 @@
-from typing import Any, Dict, List, Optional
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import FreeSimpleGUI as sg
 import sounddevice as sd
-import soundfile as sf
 from loguru import logger
 
-from src.config import OUTPUT_FILE_NAME, SAMPLE_RATE
+from src import tracing
+from src.capture import AudioCapture, input_devices
+from src.config import (
+    CAPTURE_FEED_SECONDS,
+    CAPTURE_MICROPHONE,
+    CAPTURE_MIX_GAINS,
+    CAPTURE_POLL_INTERVAL,
+    SAMPLE_RATE,
+    SAVE_RECORDING,
+    VAD_ENABLED,
+    VAD_MAX_SILENCE,
+)
+from src.recording import Recording, save_audio_file, save_wav_file
+from utils.vad import trim_silence
+
+if TYPE_CHECKING:
+    from src.stream_transcriber import StreamingTranscriber
+
+
+# The last finished recording
+last_recording: Optional[Recording] = None
 
 
 def find_blackhole_device_id() -> Optional[int]:
@@ -24,57 +44,125 @@ def find_blackhole_device_id() -> Optional[int]:
     return None
 
 
-def record(button: sg.Element) -> None:
+def record(
+    button: sg.Element, transcriber: Optional["StreamingTranscriber"] = None
+) -> Optional[Recording]:
     """
-    Record audio from the BlackHole device while the record button is active.
-    Save the audio to a file.
+    Record audio from the BlackHole device, and the microphone with CAPTURE_MICROPHONE,
+    while the record button is active.
+    Keep the recording in memory, ready for upload, and save it to a file in the background.
+
+    Audio arrives from the capture callbacks in blocks of CAPTURE_BLOCK_SIZE, so recording
+    stops within a block of the button being released.
 
     Args:
         button (sg.Element): The record button element.
+        transcriber (Optional[StreamingTranscriber], optional): Streaming transcriber
+            fed with the recorded audio. Defaults to None.
+
+    Returns:
+        Optional[Recording]: The recording, or None if nothing was recorded.
     """
     logger.debug("Recording...")
     frames: List[np.ndarray] = []
-
-    # Find BlackHole device ID
-    device_id: Optional[int] = find_blackhole_device_id()
+    mix_weights: Optional[Tuple[float, ...]] = None
+
+    # The transcriber gets the blocks in batches, pause detection on every block would cost more than the block
+    batch: List[np.ndarray] = []
+    batch_samples: int = 0
+    feed_samples: int = int(CAPTURE_FEED_SECONDS * SAMPLE_RATE)
+
+    def add(data: np.ndarray) -> None:
+        nonlocal batch_samples
+        frames.append(data)
+        if transcriber:
+            batch.append(data)
+            batch_samples += len(data)
+            if batch_samples >= feed_samples:
+                transcriber.feed(np.vstack(batch))
+                batch.clear()
+                batch_samples = 0
 
     # Record audio
     try:
-        with sd.InputStream(samplerate=SAMPLE_RATE, device=device_id) as stream:
+        devices: List[Optional[int]] = input_devices(find_blackhole_device_id(), CAPTURE_MICROPHONE)
+        capture = AudioCapture(devices, gains=CAPTURE_MIX_GAINS)
+        mix_weights = capture.mix_weights
+        if transcriber:
+            transcriber.mix_weights = mix_weights
+        with capture:
             while button.metadata.state:
-                data: np.ndarray
-                overflowed: bool
-                data, overflowed = stream.read(SAMPLE_RATE)
-                if overflowed:
-                    logger.warning("Audio buffer overflowed")
-                frames.append(data)
+                data: Optional[np.ndarray] = capture.read(timeout=CAPTURE_POLL_INTERVAL)
+                if data is not None:
+                    add(data)
+        # Blocks delivered before the streams stopped
+        rest: Optional[np.ndarray] = capture.flush()
+        if rest is not None:
+            add(rest)
 
     except Exception as e:
         logger.error(f"An error occurred during recording: {e}")
 
-    # Save audio file
-    if frames:
-        audio_data: np.ndarray = np.vstack(frames)
-        save_audio_file(audio_data)
-    else:
+    # Send the last chunk to the ASR server right away
+    if transcriber:
+        if batch:
+            transcriber.feed(np.vstack(batch))
+        transcriber.close()
+
+    with tracing.trace("recording"), tracing.span("record.flush", blocks=len(frames)):
+        return _finish_recording(frames, transcriber, mix_weights)
+
+
+def _finish_recording(
+    frames: List[np.ndarray],
+    transcriber: Optional["StreamingTranscriber"],
+    mix_weights: Optional[Tuple[float, ...]] = None,
+) -> Optional[Recording]:
+    global last_recording
+    if not frames:
         logger.warning("No audio recorded.")
+        return None
 
+    audio_data: np.ndarray = np.vstack(frames)
+    if VAD_ENABLED:
+        with tracing.span("record.trim"):
+            audio_data = trim_audio(audio_data)
+    recording = Recording(audio_data, SAMPLE_RATE, mix_weights)
 
-def save_audio_file(
-    audio_data: np.ndarray, output_file_name: str = OUTPUT_FILE_NAME
-) -> None:
+    # Without streaming the whole recording is uploaded, encode it now
+    if transcriber:
+        transcriber.recording = recording
+    else:
+        recording.upload_payload()
+    last_recording = recording
+
+    # Hashed like the saved file, so transcribing that file later hits the transcription cache.
+    # Off the stop path, the hash is only waited for where the cache is looked up.
+    threading.Thread(target=_hash_and_save, args=(recording,), daemon=True).start()
+
+    return recording
+
+
+def _hash_and_save(recording: Recording) -> None:
+    wav: bytes = recording.wav()
+    if SAVE_RECORDING:
+        save_wav_file(wav)
+
+
+def trim_audio(audio_data: np.ndarray) -> np.ndarray:
     """
-    Save the audio data to a file.
+    Cut silence from the recording before it is uploaded.
 
     Args:
         audio_data (np.ndarray): The audio data.
-        output_file_name (str, optional): The output file name. Defaults to OUTPUT_FILE_NAME.
+
+    Returns:
+        np.ndarray: The trimmed audio data, or the original data if no speech was detected.
     """
-    sf.write(
-        file=output_file_name,
-        data=audio_data,
-        samplerate=SAMPLE_RATE,
-        format="WAV",
-        subtype="PCM_16",
-    )
-    logger.debug(f"Audio saved to: {output_file_name}...")
+    trimmed: np.ndarray = trim_silence(audio_data, SAMPLE_RATE, max_silence=VAD_MAX_SILENCE)
+    if not len(trimmed):
+        logger.warning("No speech detected, keeping the whole recording.")
+        return audio_data
+
+    logger.debug(f"Trimmed {1 - len(trimmed) / len(audio_data):.0%} of silence.")
+    return trimmed
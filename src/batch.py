@@ -0,0 +1,225 @@
+"""
+Headless batch mode: transcribe a folder of recordings and generate both answers for each.
+
+Decoding, resampling and compressing audio and encoding screenshots run in a process pool,
+requests run concurrently up to a bound. One JSON record per recording is written to the
+output file as soon as it is done.
+
+Usage:
+    python batch.py recordings/ [--screenshots DIR] [--model MODEL] [--concurrency N] [--workers N]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import soundfile as sf
+
+from src.config import (
+    DUAL_ANSWER,
+    DUAL_ANSWER_TEMPERATURE,
+    SCREENSHOT_FORMAT,
+    SCREENSHOT_MAX_SIDE,
+    SCREENSHOT_MAX_TOKENS,
+    SCREENSHOT_QUALITY,
+    UPLOAD_FORMAT,
+    UPLOAD_SAMPLE_RATE,
+)
+from utils.audio_encoding import downmix, encode_audio, resample
+
+SCREENSHOT_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+@dataclass
+class BatchResult:
+    """
+    The result record of one recording.
+    """
+
+    file: str
+    screenshot: Optional[str]
+    model: str
+    transcript: Optional[str] = None
+    quick_answer: Optional[str] = None
+    full_answer: Optional[str] = None
+    error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    tokens: Dict[str, int] = field(default_factory=dict)
+
+
+def find_inputs(folder: str, screenshots: Optional[str] = None) -> List[Tuple[str, Optional[str]]]:
+    """
+    Find the WAV files in a folder and the screenshot with the same name of each.
+
+    Args:
+        folder (str): The folder of recordings.
+        screenshots (Optional[str], optional): The folder of screenshots. Defaults to the folder of recordings.
+
+    Returns:
+        List[Tuple[str, Optional[str]]]: The recording and screenshot paths.
+    """
+    screenshots = screenshots or folder
+    inputs: List[Tuple[str, Optional[str]]] = []
+    for name in sorted(os.listdir(folder)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() != ".wav":
+            continue
+        candidates = (os.path.join(screenshots, stem + ext) for ext in SCREENSHOT_EXTENSIONS)
+        inputs.append((os.path.join(folder, name), next((p for p in candidates if os.path.exists(p)), None)))
+    return inputs
+
+
+def prepare(path: str, screenshot: Optional[str]) -> Tuple[str, bytes, str, Optional[str]]:
+    """
+    Hash and encode a recording for upload and encode its screenshot. Runs in a worker process.
+
+    Args:
+        path (str): The recording.
+        screenshot (Optional[str]): The screenshot.
+
+    Returns:
+        Tuple[str, bytes, str, Optional[str]]: The SHA-1 of the file, the encoded audio,
+            its file name, and the screenshot as a data URL.
+    """
+    with open(path, "rb") as f:
+        sha1_hash: str = hashlib.sha1(f.read()).hexdigest()
+
+    audio_data, samplerate = sf.read(path, dtype="float32")
+    mono = resample(downmix(audio_data), samplerate, UPLOAD_SAMPLE_RATE)
+    payload, filename = encode_audio(mono, UPLOAD_SAMPLE_RATE, UPLOAD_FORMAT)
+
+    image: Optional[str] = None
+    if screenshot:
+        from PIL import Image
+
+        from utils.image import encode_image_data_url
+
+        with Image.open(screenshot) as img:
+            image = encode_image_data_url(
+                img,
+                image_format=SCREENSHOT_FORMAT,
+                quality=SCREENSHOT_QUALITY,
+                max_side=SCREENSHOT_MAX_SIDE,
+                max_tokens=SCREENSHOT_MAX_TOKENS,
+            )
+    return sha1_hash, payload, filename, image
+
+
+async def process(
+    pool: ProcessPoolExecutor,
+    semaphore: asyncio.Semaphore,
+    path: str,
+    screenshot: Optional[str],
+    args: argparse.Namespace,
+) -> BatchResult:
+    """
+    Transcribe one recording and generate both answers. Errors end up in the result.
+    """
+    # Imported here, the worker processes only need prepare()
+    from src import gpt_query, tracing
+    from src.models import AnalyzeType
+    from utils.list_models import supports_vision
+    from utils.transcribe import atranscribe_audio_bytes
+
+    result = BatchResult(path, screenshot, args.model)
+    async with semaphore:
+        with tracing.trace("batch") as batch_trace:
+            try:
+                loop = asyncio.get_running_loop()
+                sha1_hash, payload, filename, image = await tracing.timed(
+                    "prepare", loop.run_in_executor(pool, prepare, path, screenshot)
+                )
+
+                transcription = gpt_query.Transcription(sha1_hash)
+                transcript: Optional[str] = gpt_query.cached_transcript(transcription)
+                if transcript is None:
+                    with tracing.span("asr.upload", bytes=len(payload)):
+                        transcript = await atranscribe_audio_bytes(payload, filename)
+                    gpt_query.remember_transcript(transcription, transcript)
+                result.transcript = transcript
+
+                vision: bool = image is not None and supports_vision(args.model)
+                options: Dict[str, Any] = dict(
+                    model=args.model,
+                    position=args.position,
+                    analyze_type=AnalyzeType.ANALYZE_SS if vision else AnalyzeType.ANALYZE,
+                    image=image if vision else None,
+                    use_cache=not args.no_answer_cache,
+                )
+                if DUAL_ANSWER:
+                    text: str = await gpt_query.agenerate_answer(
+                        transcript, temperature=DUAL_ANSWER_TEMPERATURE, dual_answer=True, **options
+                    )
+                    quick, full = gpt_query.split_dual_answer(text)
+                    result.quick_answer, result.full_answer = quick, full if full is not None else quick
+                else:
+                    result.quick_answer, result.full_answer = await asyncio.gather(
+                        gpt_query.agenerate_answer(transcript, short_answer=True, temperature=0, **options),
+                        gpt_query.agenerate_answer(transcript, short_answer=False, temperature=0.7, **options),
+                    )
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+
+    for span in batch_trace.spans:
+        result.timings[span.name] = round(result.timings.get(span.name, 0.0) + span.duration, 4)
+    result.timings["total"] = round(batch_trace.duration or 0.0, 4)
+    result.tokens = batch_trace.tokens()
+    return result
+
+
+async def run_batch(args: argparse.Namespace) -> List[BatchResult]:
+    """
+    Process every recording of the folder and write the results as JSON lines.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        List[BatchResult]: The results, in the order they finished.
+    """
+    inputs = find_inputs(args.folder, args.screenshots)
+    print(f"{len(inputs)} recordings, {sum(1 for _, s in inputs if s)} with screenshots")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results: List[BatchResult] = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, open(args.output, "w", encoding="utf-8") as out:
+        tasks = [asyncio.create_task(process(pool, semaphore, path, shot, args)) for path, shot in inputs]
+        for done in asyncio.as_completed(tasks):
+            result: BatchResult = await done
+            results.append(result)
+            out.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+            out.flush()
+            status: str = f"error: {result.error}" if result.error else f"{result.timings['total']:.2f} s"
+            print(f"[{len(results)}/{len(inputs)}] {result.file}: {status}")
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    from src.config import DEFAULT_MODEL, DEFAULT_POSITION
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", help="Folder of WAV recordings")
+    parser.add_argument("--screenshots", help="Folder of screenshots named like the recordings (default: folder)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model to answer with")
+    parser.add_argument("--position", default=DEFAULT_POSITION, help="Position of the interview")
+    parser.add_argument("--concurrency", type=int, default=8, help="Recordings processed at once")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes for audio and image encoding")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSON lines file with one result per input")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Always ask the model")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    start: float = time.perf_counter()
+    results: List[BatchResult] = asyncio.run(run_batch(args))
+    failed: int = sum(1 for result in results if result.error)
+    print(
+        f"\n{len(results) - failed} done, {failed} failed in {time.perf_counter() - start:.1f} s, "
+        f"results written to {args.output}"
+    )
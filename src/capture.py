@@ -0,0 +1,210 @@
+import queue
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import sounddevice as sd
+from loguru import logger
+
+from src.config import CAPTURE_BLOCK_SIZE, SAMPLE_RATE
+from utils.audio_encoding import downmix
+
+# A device this far behind the others is taken as stalled and padded with silence
+MAX_LAG_SECONDS = 1.0
+
+
+class CaptureSource:
+    """
+    An input device recorded by a PortAudio callback.
+
+    The callback only copies the block into a SimpleQueue, whose put never blocks
+    on a Python-level lock, so the audio thread is never held up by the GUI or the
+    recording loop.
+    """
+
+    def __init__(self, device: Optional[int], samplerate: int, blocksize: int, channels: Optional[int] = None) -> None:
+        self.device: Optional[int] = device
+        self.queue: "queue.SimpleQueue[np.ndarray]" = queue.SimpleQueue()
+        self.overflows: int = 0
+        # Samples taken from the queue but not yet aligned with the other sources
+        self.pending: List[np.ndarray] = []
+        self.pending_samples: int = 0
+        self.stream = sd.InputStream(
+            samplerate=samplerate,
+            device=device,
+            channels=channels,
+            blocksize=blocksize,
+            dtype="float32",
+            callback=self._callback,
+        )
+
+    def _callback(self, indata: np.ndarray, frames: int, time: Any, status: "sd.CallbackFlags") -> None:
+        if status.input_overflow:
+            self.overflows += 1
+        self.queue.put(indata.copy())
+
+    def drain(self) -> None:
+        """
+        Move the queued blocks to the pending samples.
+        """
+        while True:
+            try:
+                block: np.ndarray = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            self.pending.append(block)
+            self.pending_samples += len(block)
+
+    def take(self, samples: int) -> np.ndarray:
+        """
+        Take samples from the pending ones, padded with silence if there are fewer.
+
+        Args:
+            samples (int): The number of samples.
+
+        Returns:
+            np.ndarray: The samples, (samples, channels).
+        """
+        channels: int = self.stream.channels
+        data: np.ndarray = np.vstack(self.pending) if self.pending else np.zeros((0, channels), dtype=np.float32)
+        taken, rest = data[:samples], data[samples:]
+        self.pending = [rest] if len(rest) else []
+        self.pending_samples = len(rest)
+        if len(taken) < samples:
+            taken = np.vstack((taken, np.zeros((samples - len(taken), channels), dtype=np.float32)))
+        return taken
+
+
+class AudioCapture:
+    """
+    Callback-driven capture from one or more input devices, e.g. the system loopback and the microphone.
+
+    With one device its blocks are returned as they arrive, with all of its channels.
+    With several, each device is downmixed to one channel and the channels are aligned
+    sample by sample, so the system audio and the microphone stay separate channels
+    of the recording. They are mixed with `mix_weights` for transcription.
+    """
+
+    def __init__(
+        self,
+        devices: List[Optional[int]],
+        samplerate: int = SAMPLE_RATE,
+        blocksize: int = CAPTURE_BLOCK_SIZE,
+        gains: Optional[Tuple[float, ...]] = None,
+    ) -> None:
+        self.samplerate: int = samplerate
+        # The microphone is usually mono, the loopback keeps its own channel count
+        self.sources: List[CaptureSource] = [
+            CaptureSource(device, samplerate, blocksize, channels=None if i == 0 else 1)
+            for i, device in enumerate(devices)
+        ]
+        self.gains: Optional[Tuple[float, ...]] = gains
+
+    @property
+    def mix_weights(self) -> Optional[Tuple[float, ...]]:
+        """
+        The weights of the channels when they are mixed to mono, None for a plain average.
+        """
+        if len(self.sources) == 1 or not self.gains:
+            return None
+        return tuple(self.gains[: len(self.sources)])
+
+    def __enter__(self) -> "AudioCapture":
+        for source in self.sources:
+            source.stream.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def stop(self) -> None:
+        """
+        Stop and close the streams. Blocks already delivered stay queued for read().
+        """
+        for source in self.sources:
+            if not source.stream.closed:
+                # Only waits for the block being recorded, a few milliseconds
+                source.stream.stop()
+                source.stream.close()
+            if source.overflows:
+                logger.warning(f"Audio input overflowed {source.overflows} times on device {source.device}")
+
+    def read(self, timeout: float) -> Optional[np.ndarray]:
+        """
+        Get the next recorded audio.
+
+        Args:
+            timeout (float): How long to wait for it in seconds.
+
+        Returns:
+            Optional[np.ndarray]: The audio, (samples, channels), or None if nothing arrived.
+        """
+        first: CaptureSource = self.sources[0]
+        if len(self.sources) == 1:
+            try:
+                return first.queue.get(timeout=timeout)
+            except queue.Empty:
+                return None
+
+        # Wait for the first source, the others run on the same clock rate
+        try:
+            block: np.ndarray = first.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        first.pending.append(block)
+        first.pending_samples += len(block)
+        for source in self.sources:
+            source.drain()
+
+        samples: int = min(source.pending_samples for source in self.sources)
+        longest: int = max(source.pending_samples for source in self.sources)
+        if longest - samples > MAX_LAG_SECONDS * self.samplerate:
+            logger.warning("An audio input device stopped delivering, padding it with silence")
+            samples = longest
+        if not samples:
+            return None
+        return self._aligned(samples)
+
+    def flush(self) -> Optional[np.ndarray]:
+        """
+        Get the audio left after stop(). Shorter sources are padded with silence.
+
+        Returns:
+            Optional[np.ndarray]: The audio, (samples, channels), or None if nothing is left.
+        """
+        for source in self.sources:
+            source.drain()
+        samples: int = max(source.pending_samples for source in self.sources)
+        if not samples:
+            return None
+        if len(self.sources) == 1:
+            return self.sources[0].take(samples)
+        return self._aligned(samples)
+
+    def _aligned(self, samples: int) -> np.ndarray:
+        return np.column_stack([downmix(source.take(samples)) for source in self.sources])
+
+
+def input_devices(loopback: Optional[int], microphone: bool) -> List[Optional[int]]:
+    """
+    Choose the devices to record: the loopback device, and the default microphone if asked
+    for or if there is no loopback device.
+
+    Args:
+        loopback (Optional[int]): The loopback device ID, e.g. BlackHole.
+        microphone (bool): Whether to record the microphone next to the loopback device.
+
+    Returns:
+        List[Optional[int]]: The device IDs, None is the default input device.
+    """
+    if loopback is None:
+        return [None]
+    devices: List[Optional[int]] = [loopback]
+    if microphone:
+        try:
+            default: int = sd.query_devices(kind="input")["index"]
+        except sd.PortAudioError as e:
+            logger.warning(f"No microphone found, recording the system audio only: {e}")
+            return devices
+        if default != loopback:
+            devices.append(default)
+    return devices
@@ -1,5 +1,10 @@
-from utils.list_models import get_models
-from utils.cache import get_default_model, set_default_model, get_default_position, ensure_cache_exists
+from utils.cache import (
+    ensure_cache_exists,
+    get_cached_models,
+    get_default_model,
+    get_default_position,
+    set_default_model,
+)
 
 APPLICATION_WIDTH = 85
 THEME = "DarkGray12"
@@ -7,11 +12,98 @@ THEME = "DarkGray12"
 OUTPUT_FILE_NAME = "record.wav"
 SAMPLE_RATE = 48000
 
+# Recordings are kept in memory, saving a copy to OUTPUT_FILE_NAME is optional
+SAVE_RECORDING = True
+
+# Capture: audio is delivered by the device callbacks in blocks, so recording stops within a block
+CAPTURE_BLOCK_SIZE = 480  # samples, 10 ms at SAMPLE_RATE
+CAPTURE_POLL_INTERVAL = 0.01  # seconds the recording loop waits for a block before checking the button
+CAPTURE_FEED_SECONDS = 0.25  # audio fed to the streaming transcriber at once
+# Record the default microphone next to BlackHole, each device as its own channel of the recording
+CAPTURE_MICROPHONE = False
+CAPTURE_MIX_GAINS = (1.0, 1.0)  # system audio, microphone, when they are mixed for transcription
+
+# Voice-activity trimming: pauses longer than VAD_MAX_SILENCE are cut before upload
+VAD_ENABLED = True
+VAD_MAX_SILENCE = 0.5  # seconds
+
+# Upload encoding: recordings are downmixed, resampled and compressed before upload
+UPLOAD_FORMAT = "flac"  # "wav", "flac" or "opus"
+UPLOAD_SAMPLE_RATE = 16000
+
+# Persistent transcription cache, keyed by audio content and ASR parameters
+TRANSCRIPTION_CACHE_FILE = "transcriptions.db"
+TRANSCRIPTION_CACHE_MAX_ENTRIES = 1000
+TRANSCRIPTION_CACHE_MAX_BYTES = 5 * 1024 * 1024
+
+# Persistent cache of deterministic (temperature 0) answers
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_FILE = "answers.db"
+ANSWER_CACHE_MAX_ENTRIES = 500
+ANSWER_CACHE_MAX_BYTES = 5 * 1024 * 1024
+ANSWER_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+
+# Screenshots are downscaled and encoded once in memory, shared by both answers
+SCREENSHOT_FILE_NAME = "screenshot.png"
+SAVE_SCREENSHOT = True
+SCREENSHOT_FORMAT = "JPEG"  # "JPEG", "WEBP" or "PNG"
+SCREENSHOT_QUALITY = 85
+SCREENSHOT_MAX_SIDE = 1536  # pixels
+SCREENSHOT_MAX_TOKENS = 1105  # vision input tokens, 6 tiles
+
+# Streaming transcription: closed chunks are sent to the ASR server while recording
+STREAMING_TRANSCRIPTION = True
+CHUNK_SECONDS = 5
+CHUNK_OVERLAP_SECONDS = 1
+
+# Speculative quick answer: at a pause in the recording the quick answer is generated from the
+# partial transcript. It is kept if the final transcript is similar enough, otherwise re-issued.
+# Needs STREAMING_TRANSCRIPTION.
+SPECULATIVE_ANSWER = True
+SPECULATIVE_PAUSE = 0.8  # seconds of silence after speech
+SPECULATIVE_MIN_SIMILARITY = 0.9  # word-level similarity of the partial and final transcripts
+
+# Streaming answers: tokens are shown as they arrive, flushed in batches
+STREAMING_ANSWERS = True
+STREAM_FLUSH_INTERVAL = 0.15  # seconds
+
+# Dual answer (opt-in): one completion returns the quick answer, a delimiter and the full answer,
+# so the transcript and the screenshot are sent once. Both answers then share one temperature:
+# the full answer is generated at DUAL_ANSWER_TEMPERATURE instead of 0.7.
+DUAL_ANSWER = False
+DUAL_ANSWER_TEMPERATURE = 0  # deterministic, so the answer cache applies
+
+# Conversation memory (opt-in): earlier questions and answers are sent with the next question.
+# They are kept under MEMORY_MAX_TOKENS, older ones are compressed into a running summary.
+MEMORY_ENABLED = False
+MEMORY_MAX_TOKENS = 2000  # summary and recent turns
+MEMORY_SUMMARY_MAX_TOKENS = 400
+MEMORY_SUMMARY_MODEL = None  # None uses the answer model
+
+# Tracing: per-stage spans are shown in the status line and written to the sinks, None disables a sink
+TRACE_JSONL_FILE = "traces.jsonl"
+TRACE_PROMETHEUS_FILE = None  # e.g. "hack_interview.prom" for the node_exporter textfile collector
+
+# Response file: written by a single writer thread, earlier answers are archived per session
+RESPONSE_FILE = "RESPONSE.md"
+RESPONSE_ARCHIVE_DIR = "responses"  # None disables the archive
+RESPONSE_ARCHIVE_KEEP = 20  # sessions
+
+# Analyze as soon as recording stops, the same as pressing Analyze (or Analyze SS with the screenshot area on)
+AUTO_ANALYZE = False
+# Keep the connections to the ASR and OpenAI servers open while recording
+PREWARM_CONNECTIONS = True
+PREWARM_INTERVAL = 60  # seconds, below the keep-alive expiry of the connection pool
+
+# Timeouts of the analysis engine
+TRANSCRIBE_TIMEOUT = 60  # seconds
+ANSWER_TIMEOUT = 120  # seconds
+
 # Ensure cache exists before using it
 ensure_cache_exists()
 
-# Get models from cache or API
-MODELS = sorted(get_models())
+# Get models from cache, an empty cache is filled in the background once the window is shown
+MODELS = sorted(get_cached_models())
 
 # Get default model from cache or use first model in the list
 cached_default_model = get_default_model()
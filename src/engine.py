@@ -0,0 +1,59 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+from loguru import logger
+
+
+class AnalysisEngine:
+    """
+    A single background thread running an asyncio event loop.
+
+    Transcription, screenshot encoding and answer generation are submitted as
+    coroutines and run concurrently on this loop. Coroutines report their
+    results back to the GUI loop with window.write_event_value.
+    """
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="analysis-engine", daemon=True)
+        self._thread.start()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Future:
+        """
+        Schedule a coroutine on the engine loop. Errors are logged, not raised.
+
+        Args:
+            coro (Coroutine): The coroutine to run.
+            timeout (Optional[float], optional): Timeout in seconds. Defaults to None.
+
+        Returns:
+            Future: The future of the coroutine's result.
+        """
+        return asyncio.run_coroutine_threadsafe(self._guarded(coro, timeout), self._loop)
+
+    async def _guarded(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float]) -> Any:
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Operation timed out after {timeout} s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"An error occurred during analysis: {e!r}")
+        return None
+
+    def stop(self) -> None:
+        """
+        Stop the event loop.
+        """
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -1,14 +1,35 @@
+import asyncio
 import dataclasses
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from loguru import logger
-from openai import ChatCompletion, OpenAI
+from openai import ChatCompletion
 from openai.types.audio import Transcription
 
-from src.config import DEFAULT_MODEL, DEFAULT_POSITION, OUTPUT_FILE_NAME
+from src import tracing
+from src.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_FILE,
+    ANSWER_CACHE_MAX_BYTES,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_TTL,
+    DEFAULT_MODEL,
+    DEFAULT_POSITION,
+    OUTPUT_FILE_NAME,
+    SCREENSHOT_FILE_NAME,
+    TRANSCRIPTION_CACHE_FILE,
+    TRANSCRIPTION_CACHE_MAX_BYTES,
+    TRANSCRIPTION_CACHE_MAX_ENTRIES,
+)
 from src.models import AnalyzeType
+from src.recording import Recording, load_for_upload
+from utils.disk_cache import DiskCache
 from utils.image import encode_image
-from utils.transcribe import transcribe_audio_from_file
+from utils.list_models import supports_vision
+from utils.transcribe import atranscribe_audio_bytes, get_asr_backend, transcribe_audio_bytes
+from utils.transport import get_async_openai_client, get_openai_client
 
 SYS_PREFIX: str = "Ти відповідаєш на запитання викладача з "
 SYS_SUFFIX: str = """ .
@@ -25,24 +46,41 @@ LONG_INSTRUCTION: str = """
 Перевір що відповідь містить не більше ніж 150-200 слів. 
 """
 
+# Separates the quick answer from the full answer in a dual answer
+ANSWER_DELIMITER: str = "<<<FULL>>>"
+DUAL_INSTRUCTION: str = f"""
+Дай дві відповіді на запитання.
+Спочатку коротка відповідь, не більше 50 слів.
+Потім окремий рядок {ANSWER_DELIMITER}
+Після нього детальна відповідь. Перш ніж відповісти, глибоко вдихни і подумай крок за кроком.
+Якщо у відповіді є формули, то треба записати короткі визначення всіх параметрів, змінних та самої формули.
+Детальна відповідь містить не більше ніж 150-200 слів.
+"""
+
+# Folds earlier questions and answers into the running summary of the conversation memory
+SUMMARY_INSTRUCTION: str = """
+Ти ведеш стислий конспект співбесіди.
+Доповни попередній конспект новими запитаннями та відповідями.
+Збережи теми, ключові факти, формули і те, що вже було сказано, без повторів.
+Конспект має бути не довшим за {words} слів.
+"""
+
 load_dotenv()
 
-client: OpenAI = OpenAI()
 
 @dataclasses.dataclass
 class Transcription:
-    path: str
+    sha1_hash: str
     text: str | None = None
-    _sha1_hash: str = dataclasses.field(init=False)
 
-    def __post_init__(self):
+    @classmethod
+    def from_file(cls, path: str) -> "Transcription":
         import hashlib
-        with open(self.path, "rb") as f:
-            self._sha1_hash = hashlib.sha1(f.read()).hexdigest()
-
-    @property
-    def sha1_hash(self):
-        return self._sha1_hash
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                sha1.update(block)
+        return cls(sha1.hexdigest())
 
     def __eq__(self, other):
         return self.sha1_hash == other.sha1_hash
@@ -50,13 +88,43 @@ class Transcription:
     def __hash__(self):
         return hash(self.sha1_hash)
 
+    @property
+    def cache_key(self) -> str:
+        # The same audio gives a different transcript with another backend, server or parameters
+        return DiskCache.make_key(self.sha1_hash, *get_asr_backend().cache_id)
+
 
-last_transcription: Transcription | None = None
+transcription_cache = DiskCache(
+    TRANSCRIPTION_CACHE_FILE,
+    max_entries=TRANSCRIPTION_CACHE_MAX_ENTRIES,
+    max_bytes=TRANSCRIPTION_CACHE_MAX_BYTES,
+)
+
+
+def cached_transcript(transcription: Transcription) -> Optional[str]:
+    """
+    Look the transcription up in the transcription cache.
+    """
+    text: Optional[str] = transcription_cache.get(transcription.cache_key)
+    logger.debug(f"Transcription cache {'hit' if text is not None else 'miss'}: {transcription_cache.stats()}")
+    return text
+
+
+def remember_transcript(transcription: Transcription, text: str) -> None:
+    """
+    Store the transcript in the transcription cache.
+
+    Args:
+        transcription (Transcription): The transcribed audio.
+        text (str): The transcript.
+    """
+    transcription.text = text
+    transcription_cache.set(transcription.cache_key, text)
 
 
 def transcribe_audio(path_to_file: str = OUTPUT_FILE_NAME) -> str:
     """
-    Transcribe audio from a file using the OpenAI Whisper API.
+    Transcribe audio from a file using the ASR backend.
 
     Args:
         path_to_file (str, optional): Path to the audio file. Defaults to OUTPUT_FILE_NAME.
@@ -64,40 +132,172 @@ def transcribe_audio(path_to_file: str = OUTPUT_FILE_NAME) -> str:
     Returns:
         str: The audio transcription.
     """
-    global last_transcription
     logger.debug(f"Transcribing audio from: {path_to_file}...")
-    if last_transcription and last_transcription.text and last_transcription == Transcription(path_to_file):
-        logger.debug("Using cached transcription.")
-        return last_transcription.text
-    else:
-        last_transcription = Transcription(path_to_file)
-
-    # with open(path_to_file, "rb") as audio_file:
-    #     try:
-    #         transcript = str(client.audio.transcriptions.create(
-    #             model="whisper-1", file=audio_file, response_format="text"
-    #         ))
-    #     except Exception as error:
-    #         logger.error(f"Can't transcribe audio: {error}")
-    #         raise error
-    transcript = transcribe_audio_from_file(path_to_file)
-    last_transcription.text = transcript
+    with tracing.span("transcribe.hash"):
+        transcription = Transcription.from_file(path_to_file)
+    cached: Optional[str] = cached_transcript(transcription)
+    if cached is not None:
+        return cached
+
+    payload, filename = load_for_upload(path_to_file)
+    with tracing.span("asr.upload", bytes=len(payload)):
+        transcript = transcribe_audio_bytes(payload, filename)
+    remember_transcript(transcription, transcript)
     logger.debug("Audio transcribed.")
     print("Transcription:", transcript)
 
     return transcript
 
 
-def generate_answer(
+async def atranscribe_audio(path_to_file: str = OUTPUT_FILE_NAME) -> str:
+    """
+    Transcribe audio from a file without blocking the analysis engine loop.
+
+    Args:
+        path_to_file (str, optional): Path to the audio file. Defaults to OUTPUT_FILE_NAME.
+
+    Returns:
+        str: The audio transcription.
+    """
+    logger.debug(f"Transcribing audio from: {path_to_file}...")
+    with tracing.span("transcribe.hash"):
+        transcription = Transcription.from_file(path_to_file)
+    cached: Optional[str] = cached_transcript(transcription)
+    if cached is not None:
+        return cached
+
+    payload, filename = await asyncio.to_thread(load_for_upload, path_to_file)
+    with tracing.span("asr.upload", bytes=len(payload)):
+        transcript = await atranscribe_audio_bytes(payload, filename)
+    remember_transcript(transcription, transcript)
+    logger.debug("Audio transcribed.")
+    print("Transcription:", transcript)
+
+    return transcript
+
+
+async def atranscribe_recording(recording: Recording) -> str:
+    """
+    Transcribe a recording kept in memory. Its hash was computed while recording
+    and its encoded payload goes straight into the upload body.
+
+    Args:
+        recording (Recording): The recording.
+
+    Returns:
+        str: The audio transcription.
+    """
+    logger.debug("Transcribing the last recording...")
+    # Usually hashed while the last chunk was uploading, don't block the loop if it isn't done
+    transcription = Transcription(await asyncio.to_thread(lambda: recording.sha1_hash))
+    cached: Optional[str] = cached_transcript(transcription)
+    if cached is not None:
+        return cached
+
+    payload, filename = await asyncio.to_thread(recording.upload_payload)
+    with tracing.span("asr.upload", bytes=len(payload)):
+        transcript = await atranscribe_audio_bytes(payload, filename)
+    remember_transcript(transcription, transcript)
+    logger.debug("Audio transcribed.")
+    print("Transcription:", transcript)
+
+    return transcript
+
+
+answer_cache = DiskCache(
+    ANSWER_CACHE_FILE,
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    max_bytes=ANSWER_CACHE_MAX_BYTES,
+    ttl=ANSWER_CACHE_TTL,
+)
+
+
+def answer_cache_key(model: str, temperature: float, messages: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Build the answer cache key of a request. Only deterministic requests are cached.
+    The messages hold the system prompt, the transcript and the screenshot.
+
+    Args:
+        model (str): The model.
+        temperature (float): The temperature.
+        messages (List[Dict[str, Any]]): The chat messages.
+
+    Returns:
+        Optional[str]: The key, or None if the request must not be cached.
+    """
+    if not ANSWER_CACHE_ENABLED or temperature != 0:
+        return None
+    return DiskCache.make_key(model, temperature, messages)
+
+
+def cached_answer(key: Optional[str]) -> Optional[str]:
+    """
+    Look the answer up in the answer cache.
+    """
+    if key is None:
+        return None
+    answer: Optional[str] = answer_cache.get(key)
+    logger.debug(f"Answer cache {'hit' if answer is not None else 'miss'}: {answer_cache.stats()}")
+    return answer
+
+
+def remember_answer(key: Optional[str], answer: str) -> None:
+    """
+    Store the answer in the answer cache.
+    """
+    if key is not None and answer:
+        answer_cache.set(key, answer)
+
+
+def usage_attrs(usage: Any) -> Dict[str, int]:
+    """
+    Get the token usage of a completion as span attributes.
+
+    Args:
+        usage (Any): The usage of the completion, or None. A plain dict in stream chunks,
+            the pinned SDK doesn't know the field there.
+
+    Returns:
+        Dict[str, int]: Prompt and completion tokens, empty without usage.
+    """
+    if usage is None:
+        return {}
+    if not isinstance(usage, dict):
+        usage = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+    return {attr: usage.get(attr) or 0 for attr in ("prompt_tokens", "completion_tokens")}
+
+
+# Ask for the usage in the last chunk of a stream. Passed as extra_body,
+# the pinned SDK predates the stream_options argument.
+STREAM_OPTIONS: Dict[str, Any] = {"stream_options": {"include_usage": True}}
+
+
+@dataclasses.dataclass
+class AnswerRequest:
+    """
+    A chat completion request for an answer, and its cached answer if there is one.
+    """
+
+    messages: List[Dict[str, Any]]
+    key: Optional[str]
+    cached: Optional[str]
+
+
+def prepare_answer(
     transcript: str,
     short_answer: bool = True,
     temperature: float = 0.7,
     model: str = DEFAULT_MODEL,
     position: str = DEFAULT_POSITION,
     analyze_type: AnalyzeType = AnalyzeType.ANALYZE,
-) -> str:
+    image: Optional[str] = None,
+    use_cache: bool = True,
+    dual_answer: bool = False,
+    history: Optional[List[Dict[str, Any]]] = None,
+) -> AnswerRequest:
     """
-    Generate an answer to the question using the OpenAI API.
+    Build the messages of an answer request and look it up in the answer cache.
+    The answer functions below take the same arguments.
 
     Args:
         transcript (str): The audio transcription.
@@ -106,41 +306,355 @@ def generate_answer(
         model (str, optional): The model to use. Defaults to DEFAULT_MODEL.
         position (str, optional): The position to use. Defaults to DEFAULT_POSITION.
         analyze_type (AnalyzeType, optional): The type of analysis to perform. Defaults to AnalyzeType.ANALYZE.
+        image (Optional[str], optional): The screenshot as a data URL. Read from SCREENSHOT_FILE_NAME if not given.
+        use_cache (bool, optional): Whether to use the answer cache for deterministic requests. Defaults to True.
+        dual_answer (bool, optional): Ask for both answers split by ANSWER_DELIMITER, see split_dual_answer.
+            Overrides short_answer. Defaults to False.
+        history (Optional[List[Dict[str, Any]]], optional): Earlier messages of the conversation,
+            see ConversationMemory.messages. Defaults to None.
+
+    Returns:
+        AnswerRequest: The messages, the cache key and the cached answer.
+    """
+    messages: List[Dict[str, Any]] = build_messages(
+        transcript, short_answer, position, analyze_type, image, dual_answer, model, history
+    )
+    key: Optional[str] = answer_cache_key(model, temperature, messages) if use_cache else None
+    return AnswerRequest(messages, key, cached_answer(key))
+
+
+class StreamedAnswer:
+    """
+    Collects the tokens and the usage of a streamed answer, records its spans
+    and caches it once complete.
+    """
+
+    def __init__(self, model: str, key: Optional[str]) -> None:
+        self.model: str = model
+        self.key: Optional[str] = key
+        self.pieces: List[str] = []
+        self.usage: Any = None
+        self.start: float = time.perf_counter()
+
+    def add(self, chunk: Any) -> Optional[str]:
+        """
+        Take a stream chunk.
+
+        Args:
+            chunk (Any): The chunk.
+
+        Returns:
+            Optional[str]: The new piece of the answer, if the chunk has one.
+        """
+        self.usage = getattr(chunk, "usage", None) or self.usage
+        if not chunk.choices:
+            return None
+        delta: Optional[str] = chunk.choices[0].delta.content
+        if delta:
+            if not self.pieces:
+                tracing.record_span("llm.ttft", time.perf_counter() - self.start, model=self.model)
+            self.pieces.append(delta)
+        return delta
+
+    def finish(self) -> None:
+        """
+        Record the answer span and cache the answer. Only called for complete answers.
+        """
+        tracing.record_span(
+            "llm.generate", time.perf_counter() - self.start, model=self.model, **usage_attrs(self.usage)
+        )
+        remember_answer(self.key, "".join(self.pieces))
+
+
+def generate_answer(
+    transcript: str,
+    short_answer: bool = True,
+    temperature: float = 0.7,
+    model: str = DEFAULT_MODEL,
+    position: str = DEFAULT_POSITION,
+    analyze_type: AnalyzeType = AnalyzeType.ANALYZE,
+    image: Optional[str] = None,
+    use_cache: bool = True,
+    dual_answer: bool = False,
+    history: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """
+    Generate an answer to the question using the OpenAI API. See prepare_answer for the arguments.
 
     Returns:
         str: The generated answer.
     """
-    # Generate system prompt
-    system_prompt: str = SYS_PREFIX + position + SYS_SUFFIX
-    if short_answer:
-        system_prompt += SHORT_INSTRUCTION
-    else:
-        system_prompt += LONG_INSTRUCTION
+    request: AnswerRequest = prepare_answer(
+        transcript, short_answer, temperature, model, position, analyze_type, image, use_cache, dual_answer, history
+    )
+    if request.cached is not None:
+        return request.cached
 
     # Generate answer
     try:
-        content = [{
-            "type": "text",
-            "text": transcript,
-        }]
-        if analyze_type is AnalyzeType.ANALYZE_SS:
-            img = encode_image("screenshot.png")
-            content.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/png;base64,{img}"
-                }
-            })
-        response: ChatCompletion = client.chat.completions.create(
+        with tracing.span("llm.generate", model=model) as attrs:
+            response: ChatCompletion = get_openai_client().chat.completions.create(
+                model=model,
+                temperature=temperature,
+                messages=request.messages,
+            )
+            attrs.update(usage_attrs(response.usage))
+    except Exception as error:
+        logger.error(f"Can't generate answer: {error}")
+        raise error
+
+    answer: str = response.choices[0].message.content
+    remember_answer(request.key, answer)
+    return answer
+
+
+def stream_answer(
+    transcript: str,
+    short_answer: bool = True,
+    temperature: float = 0.7,
+    model: str = DEFAULT_MODEL,
+    position: str = DEFAULT_POSITION,
+    analyze_type: AnalyzeType = AnalyzeType.ANALYZE,
+    image: Optional[str] = None,
+    use_cache: bool = True,
+    dual_answer: bool = False,
+    history: Optional[List[Dict[str, Any]]] = None,
+) -> Iterator[str]:
+    """
+    Generate an answer, yielding tokens as they arrive. See prepare_answer for the arguments.
+
+    Yields:
+        str: The next piece of the generated answer.
+    """
+    request: AnswerRequest = prepare_answer(
+        transcript, short_answer, temperature, model, position, analyze_type, image, use_cache, dual_answer, history
+    )
+    if request.cached is not None:
+        yield request.cached
+        return
+
+    streamed = StreamedAnswer(model, request.key)
+    try:
+        stream = get_openai_client().chat.completions.create(
             model=model,
             temperature=temperature,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": content},
-            ],
+            messages=request.messages,
+            stream=True,
+            extra_body=STREAM_OPTIONS,
         )
+        for chunk in stream:
+            delta: Optional[str] = streamed.add(chunk)
+            if delta:
+                yield delta
+        streamed.finish()
+    except Exception as error:
+        logger.error(f"Can't generate answer: {error}")
+        raise error
+
+
+async def agenerate_answer(
+    transcript: str,
+    short_answer: bool = True,
+    temperature: float = 0.7,
+    model: str = DEFAULT_MODEL,
+    position: str = DEFAULT_POSITION,
+    analyze_type: AnalyzeType = AnalyzeType.ANALYZE,
+    image: Optional[str] = None,
+    use_cache: bool = True,
+    dual_answer: bool = False,
+    history: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """
+    Generate an answer using the async OpenAI client. See prepare_answer for the arguments.
+
+    Returns:
+        str: The generated answer.
+    """
+    request: AnswerRequest = prepare_answer(
+        transcript, short_answer, temperature, model, position, analyze_type, image, use_cache, dual_answer, history
+    )
+    if request.cached is not None:
+        return request.cached
+
+    try:
+        with tracing.span("llm.generate", model=model) as attrs:
+            response: ChatCompletion = await get_async_openai_client().chat.completions.create(
+                model=model,
+                temperature=temperature,
+                messages=request.messages,
+            )
+            attrs.update(usage_attrs(response.usage))
     except Exception as error:
         logger.error(f"Can't generate answer: {error}")
         raise error
 
-    return response.choices[0].message.content
+    answer: str = response.choices[0].message.content
+    remember_answer(request.key, answer)
+    return answer
+
+
+async def astream_answer(
+    transcript: str,
+    short_answer: bool = True,
+    temperature: float = 0.7,
+    model: str = DEFAULT_MODEL,
+    position: str = DEFAULT_POSITION,
+    analyze_type: AnalyzeType = AnalyzeType.ANALYZE,
+    image: Optional[str] = None,
+    use_cache: bool = True,
+    dual_answer: bool = False,
+    history: Optional[List[Dict[str, Any]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Generate an answer using the async OpenAI client, yielding tokens as they arrive.
+    See prepare_answer for the arguments. The HTTP response is closed when the
+    generator is cancelled or closed early.
+
+    Yields:
+        str: The next piece of the generated answer.
+    """
+    request: AnswerRequest = prepare_answer(
+        transcript, short_answer, temperature, model, position, analyze_type, image, use_cache, dual_answer, history
+    )
+    if request.cached is not None:
+        yield request.cached
+        return
+
+    streamed = StreamedAnswer(model, request.key)
+    try:
+        stream = await get_async_openai_client().chat.completions.create(
+            model=model,
+            temperature=temperature,
+            messages=request.messages,
+            stream=True,
+            extra_body=STREAM_OPTIONS,
+        )
+        try:
+            async for chunk in stream:
+                delta: Optional[str] = streamed.add(chunk)
+                if delta:
+                    yield delta
+            # Only complete answers are cached, not cancelled ones
+            streamed.finish()
+        finally:
+            # Close the connection right away if the answer was cancelled
+            await stream.response.aclose()
+    except Exception as error:
+        logger.error(f"Can't generate answer: {error}")
+        raise error
+
+
+async def asummarize_conversation(
+    summary: str,
+    turns: List[Tuple[str, str]],
+    model: str = DEFAULT_MODEL,
+    max_tokens: int = 400,
+) -> str:
+    """
+    Fold questions and answers into the running summary of the conversation.
+
+    Args:
+        summary (str): The summary so far, empty at first.
+        turns (List[Tuple[str, str]]): The questions and answers to add, oldest first.
+        model (str, optional): The model to use. Defaults to DEFAULT_MODEL.
+        max_tokens (int, optional): The longest summary in tokens. Defaults to 400.
+
+    Returns:
+        str: The new summary.
+    """
+    conversation: str = "\n\n".join(f"Запитання: {question}\nВідповідь: {answer}" for question, answer in turns)
+    messages: List[Dict[str, Any]] = [
+        # About 0.6 words per token leaves room for formulas
+        {"role": "system", "content": SUMMARY_INSTRUCTION.format(words=int(max_tokens * 0.6))},
+        {"role": "user", "content": f"Попередній конспект:\n{summary or '-'}\n\nНові запитання:\n{conversation}"},
+    ]
+    with tracing.span("llm.summarize", model=model, turns=len(turns)) as attrs:
+        response: ChatCompletion = await get_async_openai_client().chat.completions.create(
+            model=model,
+            temperature=0,
+            max_tokens=max_tokens,
+            messages=messages,
+        )
+        attrs.update(usage_attrs(response.usage))
+    return response.choices[0].message.content.strip()
+
+
+def build_messages(
+    transcript: str,
+    short_answer: bool,
+    position: str,
+    analyze_type: AnalyzeType,
+    image: Optional[str] = None,
+    dual_answer: bool = False,
+    model: Optional[str] = None,
+    history: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Build the chat messages for the question.
+
+    Args:
+        transcript (str): The audio transcription.
+        short_answer (bool): Whether to ask for a short answer.
+        position (str): The position to use.
+        analyze_type (AnalyzeType): The type of analysis to perform.
+        image (Optional[str], optional): The screenshot as a data URL. Read from SCREENSHOT_FILE_NAME if not given.
+        dual_answer (bool, optional): Ask for both answers split by ANSWER_DELIMITER. Defaults to False.
+        model (Optional[str], optional): The model. The screenshot is left out if it doesn't accept images.
+            Defaults to None.
+        history (Optional[List[Dict[str, Any]]], optional): Earlier messages of the conversation,
+            put between the system prompt and the question. Defaults to None.
+
+    Returns:
+        List[Dict[str, Any]]: The system, history and user messages.
+    """
+    # Generate system prompt
+    system_prompt: str = SYS_PREFIX + position + SYS_SUFFIX
+    if dual_answer:
+        system_prompt += DUAL_INSTRUCTION
+    elif short_answer:
+        system_prompt += SHORT_INSTRUCTION
+    else:
+        system_prompt += LONG_INSTRUCTION
+
+    content = [{
+        "type": "text",
+        "text": transcript,
+    }]
+    if analyze_type is AnalyzeType.ANALYZE_SS and model and not supports_vision(model):
+        logger.warning(f"{model} doesn't accept images, sending the question without the screenshot")
+    elif analyze_type is AnalyzeType.ANALYZE_SS:
+        url = image or f"data:image/png;base64,{encode_image(SCREENSHOT_FILE_NAME)}"
+        content.append({
+            "type": "image_url",
+            "image_url": {
+                "url": url
+            }
+        })
+
+    return [
+        {"role": "system", "content": system_prompt},
+        *(history or []),
+        {"role": "user", "content": content},
+    ]
+
+
+def split_dual_answer(text: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a (possibly partial) dual answer into the quick and the full answer.
+    The start of a delimiter that is still arriving is hidden from the quick answer.
+
+    Args:
+        text (str): The dual answer so far.
+
+    Returns:
+        Tuple[str, Optional[str]]: The quick answer, and the full answer or None before the delimiter.
+    """
+    quick, delimiter, full = text.partition(ANSWER_DELIMITER)
+    if delimiter:
+        return quick.strip(), full.strip()
+
+    for size in range(min(len(ANSWER_DELIMITER) - 1, len(text)), 0, -1):
+        if text.endswith(ANSWER_DELIMITER[:size]):
+            quick = text[:-size]
+            break
+    return quick.strip(), None
@@ -3,7 +3,7 @@ from typing import List, Optional, Tuple, Union
 import FreeSimpleGUI as sg
 
 from src.button import GREY_BUTTON, OFF_IMAGE
-from src.config import APPLICATION_WIDTH, DEFAULT_MODEL, MODELS, THEME, DEFAULT_POSITION
+from src.config import APPLICATION_WIDTH, AUTO_ANALYZE, DEFAULT_MODEL, MEMORY_ENABLED, MODELS, THEME, DEFAULT_POSITION
 
 
 class BtnInfo:
@@ -191,6 +191,15 @@ def build_layout() -> (
         size=(APPLICATION_WIDTH, 3), key="-TRANSCRIBED_TEXT-", text_color="white"
     )
 
+    answer_text: sg.Text = create_text_area(
+        size=(APPLICATION_WIDTH, 5), key="-ANSWER_TEXT-", text_color="white"
+    )
+
+    # Timings of the last analysis
+    status_text: sg.Text = create_text_area(
+        size=(int(APPLICATION_WIDTH * 0.8), 1), key="-STATUS_TEXT-", text_color="grey"
+    )
+
     instructions: sg.Text = create_text_area(
         size=(int(APPLICATION_WIDTH * 0.7), 2),
         key="-INSTRUCTIONS-",
@@ -221,6 +230,26 @@ def build_layout() -> (
         focus=False,
     )
 
+    answer_cache = sg.Checkbox(
+        "",
+        default=True,
+        k="-ANSWER_CACHE-",
+        tooltip="Reuse answers of identical deterministic requests. Uncheck to always ask the model",
+    )
+    memory = sg.Checkbox(
+        "",
+        default=MEMORY_ENABLED,
+        k="-MEMORY-",
+        tooltip="Send earlier questions and answers with the next question. Uncheck to forget them",
+        enable_events=True,
+    )
+    auto_analyze = sg.Checkbox(
+        "",
+        default=AUTO_ANALYZE,
+        k="-AUTO_ANALYZE-",
+        tooltip="Analyze as soon as recording stops",
+    )
+
     # Create Screenshot Area toggle button
     screenshot_area_button = create_button(
         image_data=OFF_IMAGE,
@@ -234,6 +263,9 @@ def build_layout() -> (
             [name("Model"), model, update_models_button],
             [name("Position"), position],
             [name("Screenshot Area"), screenshot_area_button],
+            [name("Answer Cache"), answer_cache],
+            [name("Memory"), memory],
+            [name("Auto Analyze"), auto_analyze],
         ],
         key="-TOP_FRAME-",
     )
@@ -252,9 +284,15 @@ def build_layout() -> (
         key="-QUESTION_FRAME-",
         border=1,
     )
+    answer_frame = create_frame(
+        title="Quick Answer",
+        layout=[[answer_text]],
+        key="-ANSWER_FRAME-",
+        border=1,
+    )
     close_button_frame = create_frame(
         title="",
-        layout=[[close_button]],
+        layout=[[status_text, close_button]],
         key="-CLOSE_BUTTON_FRAME-",
     )
 
@@ -270,7 +308,7 @@ def build_layout() -> (
     )
 
     col3 = create_column(
-        layout=[[question_frame]],
+        layout=[[question_frame], [answer_frame]],
         key="-COL3-",
     )
 
@@ -1,53 +1,141 @@
-from typing import Any, Dict
+import asyncio
+import dataclasses
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 import FreeSimpleGUI as sg
 from loguru import logger
 
-from src import audio, gpt_query
+from src import tracing
 from src.button import OFF_IMAGE, ON_IMAGE
+from src.config import (
+    ANSWER_TIMEOUT,
+    DUAL_ANSWER,
+    DUAL_ANSWER_TEMPERATURE,
+    MODELS,
+    PREWARM_CONNECTIONS,
+    PREWARM_INTERVAL,
+    RESPONSE_FILE,
+    SAVE_SCREENSHOT,
+    SCREENSHOT_FILE_NAME,
+    SCREENSHOT_FORMAT,
+    SCREENSHOT_MAX_SIDE,
+    SCREENSHOT_MAX_TOKENS,
+    SCREENSHOT_QUALITY,
+    SPECULATIVE_ANSWER,
+    SPECULATIVE_MIN_SIMILARITY,
+    STREAM_FLUSH_INTERVAL,
+    STREAMING_ANSWERS,
+    STREAMING_TRANSCRIPTION,
+    TRANSCRIBE_TIMEOUT,
+)
+from src.engine import AnalysisEngine
+from src.memory import conversation
 from src.models import AnalyzeType
+from src.response_writer import get_response_writer
 from src.screenshot_area import ScreenshotArea
-from utils.list_models import update_models
+from utils.list_models import models_expired, supports_vision, update_models
 from utils.cache import set_default_model, set_default_position
 
-# Path to the response file
-RESPONSE_FILE = "RESPONSE.md"
+# Recording and analysis pull in numpy, sounddevice, PIL and openai. They are imported
+# on first use, or by preload_modules once the window is shown.
+if TYPE_CHECKING:
+    from PIL import Image
+
+    from src.stream_transcriber import StreamingTranscriber
 
 def clear_response_file():
     """
-    Clear the response file.
+    Start the answers of the current analysis, the previous ones are archived.
     """
-    with open(RESPONSE_FILE, "w") as f:
-        f.write("")
-    logger.debug(f"Cleared {RESPONSE_FILE}")
+    get_response_writer().start(_generation)
+    logger.debug(f"Started new answers in {RESPONSE_FILE}")
 
-def write_response(response, append=False):
+def update_answer(window: sg.Window, event: str, answer: str) -> None:
     """
-    Write a response to the response file.
+    Show the (possibly partial) answer and queue it for the response file.
 
     Args:
-        response (str): The response to write.
-        append (bool, optional): Whether to append to the file. Defaults to False.
-    """
-    mode = "a" if append else "w"
-    with open(RESPONSE_FILE, mode) as f:
-        f.write(response)
-    logger.debug(f"{'Appended to' if append else 'Wrote to'} {RESPONSE_FILE}")
-
-def write_responses(response: str):
-    """
-    Write both short and full responses to the response file.
-    Clears the file first, then writes the short response,
-    adds a horizontal divider, and appends the full response.
+        window (sg.Window): The window element.
+        event (str): The answer event, "-QUICK_ANSWER-" or "-FULL_ANSWER-".
+        answer (str): The answer text so far.
     """
-    write_response("\n---\n", append=True)
-    write_response(response, append=True)
+    if event == "-QUICK_ANSWER-":
+        window["-ANSWER_TEXT-"].update(answer)
+    get_response_writer().update(_generation, event, answer)
 
 # Create a global instance of the ScreenshotArea class
 screenshot_area = ScreenshotArea()
 
+# Event loop running transcription and answer generation
+engine = AnalysisEngine()
+
 _analyze_type = AnalyzeType.ANALYZE
 
+# Streaming transcriber of the last recording
+_stream_transcriber: Optional["StreamingTranscriber"] = None
+
+# Every analysis gets a new generation ID, results of older generations are dropped
+_generation: int = 0
+_analysis: Optional[Future] = None
+
+# Keeps the connections warm while recording
+_prewarm: Optional[Future] = None
+
+# A models list refresh is running, see refresh_expired_models
+_models_refreshing: bool = False
+
+
+@dataclasses.dataclass
+class Speculation:
+    """
+    A quick answer generated from the partial transcript at a pause in the recording.
+
+    Attributes:
+        transcript (str): The partial transcript.
+        options (Dict[str, Any]): The answer options, the final analysis must use the same.
+        future (Future): The answer, None if it failed.
+    """
+
+    transcript: str
+    options: Dict[str, Any]
+    future: Future
+
+
+# Speculative quick answer of the last recording
+_speculation: Optional[Speculation] = None
+
+
+def preload_modules() -> None:
+    """
+    Import the modules of recording and analysis and warm the ASR backend up in a
+    background thread, so that the first recording doesn't wait for them.
+    """
+    def preload() -> None:
+        start: float = time.perf_counter()
+        from src import audio, gpt_query, stream_transcriber  # noqa: F401
+        from utils import image  # noqa: F401
+        from utils.transcribe import warm_up_asr
+
+        logger.debug(f"Preloaded analysis modules in {time.perf_counter() - start:.2f} s")
+        # The local model takes a few seconds to load, then stays in memory
+        warm_up_asr()
+
+    threading.Thread(target=preload, daemon=True).start()
+
+
+# Events of an analysis, their values are (generation, value) tuples
+ANALYSIS_EVENTS = (
+    "-WHISPER-",
+    "-QUICK_ANSWER_PARTIAL-",
+    "-FULL_ANSWER_PARTIAL-",
+    "-QUICK_ANSWER-",
+    "-FULL_ANSWER-",
+    "-STATUS-",
+)
+
 
 def handle_events(window: sg.Window, event: str, values: Dict[str, Any]) -> None:
     """
@@ -58,22 +146,31 @@ def handle_events(window: sg.Window, event: str, values: Dict[str, Any]) -> None
         event (str): The event.
         values (Dict[str, Any]): The values of the window.
     """
-    global _analyze_type
+    global _analyze_type, _models_refreshing
     # Check if the screenshot area window handled the event
     if screenshot_area.handle_events(event, values):
         return
 
+    # Drop late results of superseded analyses
+    if event in ANALYSIS_EVENTS:
+        generation, values[event] = values[event]
+        if generation != _generation:
+            logger.debug(f"Dropping {event} of stale analysis {generation}")
+            return
+
     # If the user is not focused on the position input, process the events
     focused_element: sg.Element = window.find_element_with_focus()
     if not focused_element or focused_element.Key != "-POSITION_INPUT-":
         if event in ("r", "R", "-RECORD_BUTTON-"):
-            recording_event(window)
+            recording_event(window, values)
         elif event in ("a", "A", "-ANALYZE_BUTTON-"):
             _analyze_type = AnalyzeType.ANALYZE
-            transcribe_event(window)
+            transcribe_event(window, values)
         elif event == "-ANALYZE_SS_BUTTON-":
             _analyze_type = AnalyzeType.ANALYZE_SS
-            analyze_ss_event(window)
+            analyze_ss_event(window, values)
+            # The vision flags come from the catalog, keep it fresh while the app runs
+            refresh_expired_models(window)
         elif event == "-SCREENSHOT_AREA_BUTTON-":
             screenshot_area_event(window)
 
@@ -87,6 +184,7 @@ def handle_events(window: sg.Window, event: str, values: Dict[str, Any]) -> None
         if model:
             logger.debug(f"Setting default model to {model}")
             set_default_model(model)
+        refresh_expired_models(window)
 
     # When the user presses Enter or Tab in the position input, update the default position
     elif event in ("Return:36", "Tab:48") and focused_element and focused_element.Key == "-POSITION_INPUT-":
@@ -96,23 +194,32 @@ def handle_events(window: sg.Window, event: str, values: Dict[str, Any]) -> None
             set_default_position(position)
             window["-ANALYZE_BUTTON-"].set_focus()
 
+    # When recording stopped, analyze right away in auto-analyze mode
+    elif event == "-RECORDED-":
+        if values["-AUTO_ANALYZE-"] and values["-RECORDED-"] is not None:
+            if window["-SCREENSHOT_AREA_BUTTON-"].metadata.state:
+                _analyze_type = AnalyzeType.ANALYZE_SS
+                analyze_ss_event(window, values)
+            else:
+                _analyze_type = AnalyzeType.ANALYZE
+                transcribe_event(window, values)
+
+    # When the conversation memory is turned off, the next question starts a new conversation
+    elif event == "-MEMORY-":
+        if not values["-MEMORY-"]:
+            conversation.clear()
+
     # When the update models button is clicked
     elif event == "-UPDATE_MODELS-":
-        logger.debug("Updating models list...")
-        window["-UPDATE_MODELS-"].update(disabled=True)
-        window["-UPDATE_MODELS-"].update(text="...")
-
-        # Update models in a separate thread to avoid blocking the UI
-        def update_models_thread():
-            models = update_models()
-            return models
-
-        window.perform_long_operation(update_models_thread, "-MODELS_UPDATED-")
+        update_models_event(window)
 
     # When models are updated
     elif event == "-MODELS_UPDATED-":
+        _models_refreshing = False
         models = values["-MODELS_UPDATED-"]
         logger.debug(f"Models updated: {len(models)} models found")
+        # Keep the shared list in sync, it is checked when the window is closed
+        MODELS[:] = sorted(models)
 
         # Get current model
         current_model = values["-MODEL_COMBO-"]
@@ -132,57 +239,301 @@ def handle_events(window: sg.Window, event: str, values: Dict[str, Any]) -> None
         window["-UPDATE_MODELS-"].update(disabled=False)
         window["-UPDATE_MODELS-"].update(text="↻")
 
-    # When the transcription is ready
+    # When a new part of the recording is transcribed
+    elif event == "-PARTIAL_TRANSCRIPT-":
+        window["-TRANSCRIBED_TEXT-"].update(values["-PARTIAL_TRANSCRIPT-"])
+
+    # When the transcription is ready, the answers are already being generated
     elif event == "-WHISPER-":
-        answer_events(window, values, _analyze_type)
+        window["-TRANSCRIBED_TEXT-"].update(values["-WHISPER-"])
+
+        # Clear the response file before the new answers arrive
+        clear_response_file()
+        window["-ANSWER_TEXT-"].update("")
+
+    # When the analysis is done, show where the time went
+    elif event == "-STATUS-":
+        window["-STATUS_TEXT-"].update(values["-STATUS-"])
+
+    # When a new batch of streamed tokens arrives
+    elif event in ("-QUICK_ANSWER_PARTIAL-", "-FULL_ANSWER_PARTIAL-"):
+        update_answer(window, event.replace("_PARTIAL", ""), values[event])
 
     # When the quick answer is ready
     elif event == "-QUICK_ANSWER-":
         logger.debug("Quick answer generated.")
         print("Quick answer:", values["-QUICK_ANSWER-"])
 
-        # If we already have a full answer, write both to the file
         if "-QUICK_ANSWER-" in values and values["-QUICK_ANSWER-"]:
-            write_responses(values["-QUICK_ANSWER-"])
+            update_answer(window, event, values["-QUICK_ANSWER-"])
 
     # When the full answer is ready
     elif event == "-FULL_ANSWER-":
         logger.debug("Full answer generated.")
         print("Full answer:", values["-FULL_ANSWER-"])
 
-        # If we already have a quick answer, write both to the file
         if "-FULL_ANSWER-" in values and values["-FULL_ANSWER-"]:
-            write_responses(values["-FULL_ANSWER-"])
+            update_answer(window, event, values["-FULL_ANSWER-"])
+
+
+def refresh_expired_models(window: sg.Window) -> None:
+    """
+    Refresh the models list in the background if there is none or it is older than MODELS_TTL.
+    Checked at startup and again when the model or the screenshot analysis is used.
 
+    Args:
+        window (sg.Window): The window element.
+    """
+    if _models_refreshing or (MODELS and not models_expired()):
+        return
+    update_models_event(window, quiet=True)
 
-def recording_event(window: sg.Window) -> None:
+
+def update_models_event(window: sg.Window, quiet: bool = False) -> None:
+    """
+    Fetch the models list in a separate thread, "-MODELS_UPDATED-" is sent when it is ready.
+
+    Args:
+        window (sg.Window): The window element.
+        quiet (bool, optional): Refresh in the background without touching the update button. Defaults to False.
+    """
+    global _models_refreshing
+    logger.debug("Updating models list...")
+    _models_refreshing = True
+    if not quiet:
+        window["-UPDATE_MODELS-"].update(disabled=True)
+        window["-UPDATE_MODELS-"].update(text="...")
+
+    # Update models in a separate thread to avoid blocking the UI
+    def update_models_thread():
+        models = update_models()
+        return models
+
+    window.perform_long_operation(update_models_thread, "-MODELS_UPDATED-")
+
+
+def recording_event(window: sg.Window, values: Dict[str, Any]) -> None:
     """
     Handle the recording event. Record audio and update the record button.
+    With SPECULATIVE_ANSWER the quick answer is generated at every pause, using the
+    model and settings chosen when recording started.
 
     Args:
         window (sg.Window): The window element.
+        values (Dict[str, Any]): The values of the window.
     """
+    global _stream_transcriber, _speculation, _prewarm
+    from src import audio
+    from src.stream_transcriber import StreamingTranscriber
+
     button: sg.Element = window["-RECORD_BUTTON-"]
     button.metadata.state = not button.metadata.state
     button.update(image_data=ON_IMAGE if button.metadata.state else OFF_IMAGE)
 
     # Record audio
     if button.metadata.state:
-        window.perform_long_operation(lambda: audio.record(button), "-RECORDED-")
+        # The speculative answer of the previous recording is no longer needed. Its transcriber
+        # is only dropped: an analysis may still be waiting for its last chunk.
+        if _speculation:
+            _speculation.future.cancel()
+            _speculation = None
+
+        transcriber: Optional["StreamingTranscriber"] = None
+        if STREAMING_TRANSCRIPTION:
+            settings: Dict[str, Any] = dict(
+                model=values["-MODEL_COMBO-"],
+                position=values["-POSITION_INPUT-"],
+                use_cache=values["-ANSWER_CACHE-"],
+                memory=values["-MEMORY-"],
+            )
+            transcriber = StreamingTranscriber(
+                engine,
+                on_partial=lambda text: window.write_event_value("-PARTIAL_TRANSCRIPT-", text),
+                on_pause=(lambda text: speculate(text, **settings)) if SPECULATIVE_ANSWER else None,
+            )
+        _stream_transcriber = transcriber
+        window.perform_long_operation(lambda: audio.record(button, transcriber), "-RECORDED-")
+
+        if PREWARM_CONNECTIONS:
+            _prewarm = engine.submit(prewarm_connections())
+
+    # The analysis starts with the connections that are open now
+    elif _prewarm:
+        _prewarm.cancel()
+        _prewarm = None
+
+
+async def prewarm_connections() -> None:
+    """
+    Open the connections to the ASR and OpenAI servers and keep them open until cancelled,
+    so that the first requests after recording skip DNS and the TLS handshake. Runs on the
+    engine loop, whose HTTP client the analysis uses.
+    """
+    from utils.transcribe import get_asr_backend
+    from utils.transport import awarm_connections, get_async_openai_client
 
+    urls: List[str] = [*get_asr_backend().connection_urls(), str(get_async_openai_client().base_url)]
+    while True:
+        await awarm_connections(urls)
+        await asyncio.sleep(PREWARM_INTERVAL)
 
-def transcribe_event(window: sg.Window) -> None:
+
+def speculate(transcript: str, model: str, position: str, use_cache: bool, memory: bool) -> None:
     """
-    Handle the transcribe event. Transcribe audio and update the text area.
+    Start the quick answer to the partial transcript, superseding the previous speculation.
+    Called on the engine loop at a pause in the recording.
+
+    Args:
+        transcript (str): The partial transcript.
+        model (str): The model to use.
+        position (str): The position to use.
+        use_cache (bool): Whether to use the answer cache.
+        memory (bool): Whether to use the conversation memory.
+    """
+    global _speculation
+    from src import gpt_query
+
+    if _speculation:
+        if _speculation.transcript == transcript:
+            return
+        _speculation.future.cancel()
+
+    # The same options as the quick answer of the final analysis, see answer_events
+    options: Dict[str, Any] = dict(
+        model=model,
+        position=position,
+        analyze_type=AnalyzeType.ANALYZE,
+        image=None,
+        use_cache=use_cache,
+        history=conversation.messages() if memory else None,
+    )
+
+    async def answer() -> str:
+        with tracing.trace("speculation"):
+            return await gpt_query.agenerate_answer(transcript, short_answer=True, temperature=0, **options)
+
+    logger.debug(f"Speculative quick answer to: {transcript}")
+    _speculation = Speculation(transcript, options, engine.submit(answer(), ANSWER_TIMEOUT))
+
+
+async def speculative_quick_answer(transcript: str, options: Dict[str, Any]) -> Optional[str]:
+    """
+    Take the speculative quick answer if it was generated with the same options from
+    a transcript close enough to the final one. Otherwise it is cancelled.
+
+    Args:
+        transcript (str): The final transcript.
+        options (Dict[str, Any]): The answer options of the analysis.
+
+    Returns:
+        Optional[str]: The quick answer, or None if it has to be generated again.
+    """
+    global _speculation
+    from src.stream_transcriber import transcript_similarity
+
+    speculation, _speculation = _speculation, None
+    if speculation is None:
+        return None
+
+    with tracing.span("speculation") as attrs:
+        similarity: float = transcript_similarity(speculation.transcript, transcript)
+        attrs.update(similarity=round(similarity, 3), hit=False)
+        if speculation.options != options or similarity < SPECULATIVE_MIN_SIMILARITY:
+            logger.debug(f"Speculative quick answer discarded, similarity {similarity:.2f}")
+            speculation.future.cancel()
+            return None
+        # Usually done by now, otherwise it is further along than a new request.
+        # Shielded, so that only our own cancellation cancels the speculation.
+        answer: Optional[str]
+        try:
+            answer = await asyncio.shield(asyncio.wrap_future(speculation.future))
+        except asyncio.CancelledError:
+            task: Optional[asyncio.Task] = asyncio.current_task()
+            # Superseded by speculate or cancelled by the next recording: a miss
+            if speculation.future.cancelled() and not (hasattr(task, "cancelling") and task.cancelling()):
+                return None
+            speculation.future.cancel()
+            raise
+        attrs["hit"] = answer is not None
+    logger.debug(f"Speculative quick answer {'kept' if answer is not None else 'failed'}, similarity {similarity:.2f}")
+    return answer
+
+
+async def streamed_transcript(transcriber: "StreamingTranscriber") -> str:
+    """
+    Wait for the streaming transcriber to finish the last chunk.
+    Fall back to transcribing the whole recording if any chunk failed.
+
+    Args:
+        transcriber (StreamingTranscriber): The transcriber of the last recording.
+
+    Returns:
+        str: The audio transcription.
+    """
+    from src import gpt_query
+
+    try:
+        transcript: str = await transcriber.transcript()
+    except Exception as e:
+        logger.warning(f"Falling back to full transcription: {e}")
+        return await full_transcript()
+
+    # Re-analyzing the recording later must not reach the ASR server
+    if transcriber.recording:
+        recording = transcriber.recording
+        sha1_hash: str = await asyncio.to_thread(lambda: recording.sha1_hash)
+        gpt_query.remember_transcript(gpt_query.Transcription(sha1_hash), transcript)
+    return transcript
+
+
+async def full_transcript() -> str:
+    """
+    Transcribe the whole last recording, from memory if it is there.
+
+    Returns:
+        str: The audio transcription.
+    """
+    from src import audio, gpt_query
+
+    if audio.last_recording:
+        return await gpt_query.atranscribe_recording(audio.last_recording)
+    return await gpt_query.atranscribe_audio()
+
+
+def transcribe_event(
+    window: sg.Window, values: Dict[str, Any], screenshot: Optional["Image.Image"] = None
+) -> None:
+    """
+    Handle the transcribe event. Start the analysis on the engine loop and update the text area.
+    A running analysis is cancelled and superseded by the new one.
 
     Args:
         window (sg.Window): The window element.
+        values (Dict[str, Any]): The values of the window.
+        screenshot (Optional[Image.Image], optional): The grabbed screenshot. Defaults to None.
     """
+    global _generation, _analysis
     transcribed_text: sg.Element = window["-TRANSCRIBED_TEXT-"]
     transcribed_text.update("Transcribing audio...")
 
-    # Transcribe audio
-    window.perform_long_operation(gpt_query.transcribe_audio, "-WHISPER-")
+    # Cancel the previous transcription and completions, closing their connections
+    if _analysis and not _analysis.done():
+        logger.debug(f"Cancelling analysis {_generation}")
+        _analysis.cancel()
+
+    _generation += 1
+    _analysis = engine.submit(
+        analyze(
+            window,
+            _generation,
+            model=values["-MODEL_COMBO-"],
+            position=values["-POSITION_INPUT-"],
+            analyze_type=_analyze_type,
+            use_cache=values["-ANSWER_CACHE-"],
+            screenshot=screenshot,
+            memory=values["-MEMORY-"],
+        )
+    )
 
 
 def screenshot_area_event(window: sg.Window) -> None:
@@ -200,71 +551,328 @@ def screenshot_area_event(window: sg.Window) -> None:
     screenshot_area.toggle()
 
 
-def analyze_ss_event(window: sg.Window) -> None:
+def analyze_ss_event(window: sg.Window, values: Dict[str, Any]) -> None:
     """
     Handle the analyze SS event. Take a screenshot of the screenshot area if enabled,
-    save it as screenshot.png, then transcribe audio and update the text area.
+    then transcribe audio and update the text area.
 
     Args:
         window (sg.Window): The window element.
+        values (Dict[str, Any]): The values of the window.
     """
     # Check if screenshot area is enabled
     button: sg.Element = window["-SCREENSHOT_AREA_BUTTON-"]
+    screenshot: Optional["Image.Image"] = None
     if button.metadata.state and screenshot_area.window:
-        # Take a screenshot of the screenshot area and save it as screenshot.png
+        # Take a screenshot of the screenshot area, it is encoded on the engine loop
         logger.debug("Taking screenshot of the screenshot area...")
-        screenshot_area.grab_area_screenshot("screenshot.png")
-        logger.debug("Screenshot saved as screenshot.png")
+        screenshot = screenshot_area.grab_area_screenshot()
 
     # Continue with regular analyze functionality
-    transcribe_event(window)
+    transcribe_event(window, values, screenshot)
 
 
-def answer_events(window: sg.Window, values: Dict[str, Any], analyze_type: AnalyzeType) -> None:
+def encode_screenshot(screenshot: Optional["Image.Image"] = None) -> str:
     """
-    Handle the answer events. Generate quick and full answers and update the text areas.
+    Downscale and encode the screenshot once for both answers. Runs in a worker thread.
+    Without a fresh screenshot the last saved one is used.
+
+    Args:
+        screenshot (Optional[Image.Image], optional): The grabbed screenshot. Defaults to None.
+
+    Returns:
+        str: The screenshot as a data URL.
+    """
+    from PIL import Image
+
+    from utils.image import encode_image_data_url
+
+    with tracing.span("screenshot.encode") as attrs:
+        if screenshot is None:
+            screenshot = Image.open(SCREENSHOT_FILE_NAME)
+        elif SAVE_SCREENSHOT:
+            # The full-size screenshot is kept on disk off the critical path
+            threading.Thread(target=screenshot.save, args=(SCREENSHOT_FILE_NAME,), daemon=True).start()
+
+        url: str = encode_image_data_url(
+            screenshot,
+            image_format=SCREENSHOT_FORMAT,
+            quality=SCREENSHOT_QUALITY,
+            max_side=SCREENSHOT_MAX_SIDE,
+            max_tokens=SCREENSHOT_MAX_TOKENS,
+        )
+        attrs["bytes"] = len(url)
+    return url
+
+
+async def analyze(
+    window: sg.Window,
+    generation: int,
+    model: str,
+    position: str,
+    analyze_type: AnalyzeType,
+    use_cache: bool = True,
+    screenshot: Optional["Image.Image"] = None,
+    memory: bool = False,
+) -> None:
+    """
+    Transcribe the recording and generate both answers. Runs on the engine loop.
+    The screenshot is encoded while the audio is being transcribed. The timings
+    of the stages are sent to the status line when both answers are done.
+    With the conversation memory the question and its full answer are remembered,
+    and the summary is updated after the answers are shown.
 
     Args:
         window (sg.Window): The window element.
-        values (Dict[str, Any]): The values of the window.
+        generation (int): The generation ID of the analysis.
+        model (str): The model to use.
+        position (str): The position to use.
+        analyze_type (AnalyzeType): The type of analysis to perform.
+        use_cache (bool, optional): Whether to use the answer cache. Defaults to True.
+        screenshot (Optional[Image.Image], optional): The grabbed screenshot. Defaults to None.
+        memory (bool, optional): Whether to use the conversation memory. Defaults to False.
     """
-    transcribed_text: sg.Element = window["-TRANSCRIBED_TEXT-"]
+    with tracing.trace("analysis") as analysis_trace:
+        transcript, answer = await _analyze(
+            window, generation, model, position, analyze_type, use_cache, screenshot, memory
+        )
+    window.write_event_value("-STATUS-", (generation, analysis_trace.summary()))
+
+    if memory and answer:
+        conversation.add_turn(transcript, answer)
+        with tracing.trace("memory"):
+            await conversation.compact(model)
+
+
+async def _analyze(
+    window: sg.Window,
+    generation: int,
+    model: str,
+    position: str,
+    analyze_type: AnalyzeType,
+    use_cache: bool,
+    screenshot: Optional["Image.Image"],
+    memory: bool,
+) -> Tuple[str, Optional[str]]:
+    # Only the last chunk is left if the recording was streamed
+    transcriber = _stream_transcriber
+    if transcriber and transcriber.closed:
+        transcription = tracing.timed("transcribe", streamed_transcript(transcriber), streamed=True)
+    else:
+        transcription = tracing.timed("transcribe", full_transcript(), streamed=False)
+
+    # A model without vision would reject the request, don't even encode the screenshot
+    if analyze_type is AnalyzeType.ANALYZE_SS and not supports_vision(model):
+        logger.warning(f"{model} doesn't accept images, analyzing without the screenshot")
+        analyze_type = AnalyzeType.ANALYZE
+
+    if analyze_type is AnalyzeType.ANALYZE_SS:
+        transcript, image = await asyncio.gather(
+            asyncio.wait_for(transcription, TRANSCRIBE_TIMEOUT),
+            asyncio.to_thread(encode_screenshot, screenshot),
+        )
+    else:
+        transcript, image = await asyncio.wait_for(transcription, TRANSCRIBE_TIMEOUT), None
+    window.write_event_value("-WHISPER-", (generation, transcript))
+
+    history: Optional[List[Dict[str, Any]]] = conversation.messages() if memory else None
+    answer: Optional[str] = await answer_events(
+        window, generation, transcript, model, position, analyze_type, image, use_cache, history
+    )
+    return transcript, answer
+
+
+async def answer_events(
+    window: sg.Window,
+    generation: int,
+    transcript: str,
+    model: str,
+    position: str,
+    analyze_type: AnalyzeType,
+    image: Optional[str] = None,
+    use_cache: bool = True,
+    history: Optional[List[Dict[str, Any]]] = None,
+) -> Optional[str]:
+    """
+    Generate quick and full answers and send them to the window. With DUAL_ANSWER
+    both come from one completion, otherwise from two concurrent ones. A speculative
+    quick answer that still fits the final transcript is used as is.
 
-    # Get audio transcript and update text area
-    audio_transcript: str = values["-WHISPER-"]
-    transcribed_text.update(audio_transcript)
-
-    # Get model and position
-    model: str = values["-MODEL_COMBO-"]
-    position: str = values["-POSITION_INPUT-"]
-
-    # Clear the response file before generating new answers
-    clear_response_file()
-
-    # Generate quick answer
-    logger.debug("Generating quick answer...")
-    window.perform_long_operation(
-        lambda: gpt_query.generate_answer(
-            audio_transcript,
-            short_answer=True,
-            temperature=0,
-            model=model,
-            position=position,
-            analyze_type=analyze_type,
-        ),
-        "-QUICK_ANSWER-",
+    Args:
+        window (sg.Window): The window element.
+        generation (int): The generation ID of the analysis.
+        transcript (str): The audio transcription.
+        model (str): The model to use.
+        position (str): The position to use.
+        analyze_type (AnalyzeType): The type of analysis to perform.
+        image (Optional[str], optional): The screenshot as a data URL. Defaults to None.
+        use_cache (bool, optional): Whether to use the answer cache. Defaults to True.
+        history (Optional[List[Dict[str, Any]]], optional): Earlier messages of the conversation. Defaults to None.
+
+    Returns:
+        Optional[str]: The full answer, or None if it failed.
+    """
+    options: Dict[str, Any] = dict(
+        model=model, position=position, analyze_type=analyze_type, image=image, use_cache=use_cache, history=history
     )
 
-    # Generate full answer
-    logger.debug("Generating full answer...")
-    window.perform_long_operation(
-        lambda: gpt_query.generate_answer(
-            audio_transcript,
-            short_answer=False,
-            temperature=0.7,
-            model=model,
-            position=position,
-            analyze_type=analyze_type,
-        ),
-        "-FULL_ANSWER-",
+    # The quick answer may have been generated during a pause in the recording
+    quick: Optional[str] = await speculative_quick_answer(transcript, options)
+    if quick is not None:
+        window.write_event_value("-QUICK_ANSWER-", (generation, quick))
+        logger.debug("Generating full answer...")
+        return await answer_event(
+            window, generation, "-FULL_ANSWER-", transcript, short_answer=False, temperature=0.7, **options
+        )
+
+    if DUAL_ANSWER:
+        logger.debug("Generating dual answer...")
+        return await dual_answer_event(
+            window, generation, transcript, temperature=DUAL_ANSWER_TEMPERATURE, **options
+        )
+
+    logger.debug("Generating quick and full answers...")
+    _, full = await asyncio.gather(
+        answer_event(window, generation, "-QUICK_ANSWER-", transcript, short_answer=True, temperature=0, **options),
+        answer_event(window, generation, "-FULL_ANSWER-", transcript, short_answer=False, temperature=0.7, **options),
     )
+    return full
+
+
+async def answer_event(
+    window: sg.Window, generation: int, event: str, transcript: str, **kwargs: Any
+) -> Optional[str]:
+    """
+    Generate one answer, streamed or in one piece, and send it to the window as `event`.
+    Errors are logged so that they don't affect the other answer.
+
+    Args:
+        window (sg.Window): The window element.
+        generation (int): The generation ID of the analysis.
+        event (str): The answer event, "-QUICK_ANSWER-" or "-FULL_ANSWER-".
+        transcript (str): The audio transcription.
+        **kwargs: Passed to gpt_query.astream_answer or gpt_query.agenerate_answer.
+
+    Returns:
+        Optional[str]: The answer, or None if it failed.
+    """
+    from src import gpt_query
+
+    try:
+        if STREAMING_ANSWERS:
+            answer: str = await asyncio.wait_for(
+                stream_to_window(window, generation, event, gpt_query.astream_answer(transcript, **kwargs)),
+                ANSWER_TIMEOUT,
+            )
+        else:
+            answer = await asyncio.wait_for(gpt_query.agenerate_answer(transcript, **kwargs), ANSWER_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.error(f"{event} timed out after {ANSWER_TIMEOUT} s")
+        return None
+    except Exception as e:
+        logger.error(f"Can't generate {event}: {e!r}")
+        return None
+
+    window.write_event_value(event, (generation, answer))
+    return answer
+
+
+async def dual_answer_event(window: sg.Window, generation: int, transcript: str, **kwargs: Any) -> Optional[str]:
+    """
+    Generate both answers in one completion and send them to the window as
+    "-QUICK_ANSWER-" and "-FULL_ANSWER-". The quick answer is final as soon as
+    the delimiter arrives, while the full answer is still streaming.
+
+    Args:
+        window (sg.Window): The window element.
+        generation (int): The generation ID of the analysis.
+        transcript (str): The audio transcription.
+        **kwargs: Passed to gpt_query.astream_answer or gpt_query.agenerate_answer.
+
+    Returns:
+        Optional[str]: The full answer, or None if it failed.
+    """
+    from src import gpt_query
+
+    quick_done: bool = False
+
+    def send_parts(text: str) -> None:
+        nonlocal quick_done
+        quick, full = gpt_query.split_dual_answer(text)
+        if quick_done:
+            window.write_event_value("-FULL_ANSWER_PARTIAL-", (generation, full))
+        elif full is None:
+            window.write_event_value("-QUICK_ANSWER_PARTIAL-", (generation, quick))
+        else:
+            quick_done = True
+            window.write_event_value("-QUICK_ANSWER-", (generation, quick))
+            window.write_event_value("-FULL_ANSWER_PARTIAL-", (generation, full))
+
+    try:
+        if STREAMING_ANSWERS:
+            tokens = gpt_query.astream_answer(transcript, dual_answer=True, **kwargs)
+            text: str = await asyncio.wait_for(
+                stream_to_window(window, generation, "-DUAL_ANSWER-", tokens, send_parts), ANSWER_TIMEOUT
+            )
+        else:
+            text = await asyncio.wait_for(
+                gpt_query.agenerate_answer(transcript, dual_answer=True, **kwargs), ANSWER_TIMEOUT
+            )
+    except asyncio.TimeoutError:
+        logger.error(f"Dual answer timed out after {ANSWER_TIMEOUT} s")
+        return None
+    except Exception as e:
+        logger.error(f"Can't generate dual answer: {e!r}")
+        return None
+
+    quick, full = gpt_query.split_dual_answer(text)
+    if full is None:
+        logger.warning("Dual answer has no delimiter, showing it as both answers")
+        full = quick
+    if not quick_done:
+        window.write_event_value("-QUICK_ANSWER-", (generation, quick))
+    window.write_event_value("-FULL_ANSWER-", (generation, full))
+    return full
+
+
+async def stream_to_window(
+    window: sg.Window,
+    generation: int,
+    event: str,
+    tokens: AsyncIterator[str],
+    on_text: Optional[Callable[[str], None]] = None,
+) -> str:
+    """
+    Collect the streamed answer, sending the text so far to the window in throttled batches.
+    Logs the time to first token.
+
+    Args:
+        window (sg.Window): The window element.
+        generation (int): The generation ID of the analysis.
+        event (str): The answer event, "-QUICK_ANSWER-" or "-FULL_ANSWER-".
+        tokens (AsyncIterator[str]): The answer tokens.
+        on_text (Optional[Callable[[str], None]], optional): Called with the text so far instead of
+            sending the partial event of `event`. Defaults to None.
+
+    Returns:
+        str: The full answer.
+    """
+    partial_event: str = event[:-1] + "_PARTIAL-"
+    pieces: List[str] = []
+    start: float = time.perf_counter()
+    last_flush: float = float("-inf")
+
+    async for token in tokens:
+        now: float = time.perf_counter()
+        if not pieces:
+            logger.info(f"{event} time to first token: {(now - start) * 1000:.0f} ms")
+        pieces.append(token)
+        if now - last_flush >= STREAM_FLUSH_INTERVAL:
+            if on_text:
+                on_text("".join(pieces))
+            else:
+                window.write_event_value(partial_event, (generation, "".join(pieces)))
+            last_flush = now
+
+    logger.info(f"{event} generated in {time.perf_counter() - start:.2f} s")
+    return "".join(pieces)
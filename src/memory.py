@@ -0,0 +1,165 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from loguru import logger
+
+from src.config import MEMORY_MAX_TOKENS, MEMORY_SUMMARY_MAX_TOKENS, MEMORY_SUMMARY_MODEL
+from utils.tokens import count_message_tokens
+
+SUMMARY_PREFIX: str = "Короткий зміст попередньої розмови:\n"
+
+
+@dataclass
+class Turn:
+    """
+    A question and its answer.
+
+    Attributes:
+        question (str): The transcript of the question.
+        answer (str): The full answer.
+        tokens (int): The tokens of both as chat messages.
+    """
+
+    question: str
+    answer: str
+    tokens: int
+
+
+class ConversationMemory:
+    """
+    The questions and answers of the interview, sent as context with the next question.
+
+    The prompt size stays flat however long the interview gets: the running summary
+    takes at most `summary_max_tokens` and the most recent turns fill the rest of
+    `max_tokens`. Turns that slid out of that window are folded into the summary
+    by `compact`, which runs after the answers are shown.
+    """
+
+    def __init__(
+        self, max_tokens: int = MEMORY_MAX_TOKENS, summary_max_tokens: int = MEMORY_SUMMARY_MAX_TOKENS
+    ) -> None:
+        self.max_tokens: int = max_tokens
+        self.summary_max_tokens: int = summary_max_tokens
+        self.summary: str = ""
+        self.turns: List[Turn] = []
+        # Turns are added on the engine loop and cleared from the GUI thread
+        self._lock = threading.Lock()
+        self._epoch: int = 0
+
+    @property
+    def window_tokens(self) -> int:
+        """
+        The tokens left for recent turns next to a full summary.
+        """
+        return max(0, self.max_tokens - self.summary_max_tokens)
+
+    def add_turn(self, question: str, answer: str) -> None:
+        """
+        Remember a question and its answer.
+
+        Args:
+            question (str): The transcript of the question.
+            answer (str): The full answer.
+        """
+        tokens: int = count_message_tokens(_turn_messages(question, answer))
+        with self._lock:
+            self.turns.append(Turn(question, answer, tokens))
+
+    def clear(self) -> None:
+        """
+        Forget the conversation, e.g. when the interview is over.
+        """
+        with self._lock:
+            self.summary = ""
+            self.turns = []
+            self._epoch += 1
+        logger.debug("Conversation memory cleared")
+
+    def messages(self) -> List[Dict[str, Any]]:
+        """
+        Build the context messages: the summary and the most recent turns that fit the budget.
+
+        Returns:
+            List[Dict[str, Any]]: Chat messages to put between the system prompt and the question.
+        """
+        with self._lock:
+            summary: str = self.summary
+            turns: List[Turn] = list(self.turns)
+
+        budget: int = self.max_tokens
+        messages: List[Dict[str, Any]] = []
+        if summary:
+            messages.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+            budget -= count_message_tokens(messages)
+
+        recent: List[Dict[str, Any]] = []
+        for turn in reversed(turns):
+            if turn.tokens > budget:
+                break
+            budget -= turn.tokens
+            recent[:0] = _turn_messages(turn.question, turn.answer)
+        return messages + recent
+
+    def overflow(self) -> List[Turn]:
+        """
+        Get the oldest turns that don't fit next to a full summary and are to be folded into it.
+
+        Returns:
+            List[Turn]: The turns, oldest first.
+        """
+        with self._lock:
+            turns: List[Turn] = list(self.turns)
+
+        kept: int = 0
+        budget: int = self.window_tokens
+        for turn in reversed(turns):
+            if turn.tokens > budget:
+                break
+            budget -= turn.tokens
+            kept += 1
+        return turns[: len(turns) - kept]
+
+    async def compact(self, model: str) -> None:
+        """
+        Fold the turns that slid out of the window into the running summary.
+        If the summary can't be generated the turns are dropped, the budget holds either way.
+
+        Args:
+            model (str): The answer model, used unless MEMORY_SUMMARY_MODEL is set.
+        """
+        from src import gpt_query
+
+        folded: List[Turn] = self.overflow()
+        if not folded:
+            return
+
+        with self._lock:
+            epoch: int = self._epoch
+            summary: str = self.summary
+
+        logger.debug(f"Folding {len(folded)} turns into the conversation summary...")
+        try:
+            summary = await gpt_query.asummarize_conversation(
+                summary,
+                [(turn.question, turn.answer) for turn in folded],
+                model=MEMORY_SUMMARY_MODEL or model,
+                max_tokens=self.summary_max_tokens,
+            )
+        except Exception as e:
+            logger.error(f"Can't summarize the conversation, dropping {len(folded)} turns: {e!r}")
+
+        with self._lock:
+            # Cleared while summarizing
+            if epoch != self._epoch:
+                return
+            self.summary = summary
+            self.turns = self.turns[len(folded):]
+
+
+def _turn_messages(question: str, answer: str) -> List[Dict[str, Any]]:
+    return [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+
+
+# The conversation of the running interview
+conversation = ConversationMemory()
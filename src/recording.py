@@ -0,0 +1,152 @@
+"""
+Finished recordings and their encoding for upload. Kept apart from src.audio, which
+records from the audio devices, so that transcribing files doesn't need PortAudio.
+"""
+import dataclasses
+import hashlib
+import io
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+from loguru import logger
+
+from src import tracing
+from src.config import OUTPUT_FILE_NAME, SAMPLE_RATE, UPLOAD_FORMAT, UPLOAD_SAMPLE_RATE
+from utils.audio_encoding import downmix, encode_audio, resample
+
+
+@dataclasses.dataclass
+class Recording:
+    """
+    A finished recording kept in memory, identified by the hash of its WAV file, see encode_wav.
+    A recording of several devices has one channel per device, mixed with `mix_weights`.
+    """
+
+    audio_data: np.ndarray
+    samplerate: int
+    mix_weights: Optional[Tuple[float, ...]] = None
+    _payload: Optional[Tuple[bytes, str]] = dataclasses.field(default=None, init=False, repr=False)
+    _sha1_hash: Optional[str] = dataclasses.field(default=None, init=False, repr=False)
+    _wav_lock: threading.Lock = dataclasses.field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def wav(self) -> bytes:
+        """
+        Encode the recording as the WAV file saved to OUTPUT_FILE_NAME and remember its hash.
+
+        Returns:
+            bytes: The WAV file.
+        """
+        with self._wav_lock:
+            with tracing.span("record.hash"):
+                wav: bytes = encode_wav(self.audio_data, self.samplerate)
+                self._sha1_hash = hashlib.sha1(wav).hexdigest()
+            return wav
+
+    @property
+    def sha1_hash(self) -> str:
+        """
+        The SHA-1 of the WAV file, the transcription cache key. Usually computed in the
+        background when recording stops, otherwise on first use.
+        """
+        if self._sha1_hash is None:
+            with self._wav_lock:
+                pending: bool = self._sha1_hash is None
+            if pending:
+                self.wav()
+        return self._sha1_hash
+
+    def upload_payload(self) -> Tuple[bytes, str]:
+        """
+        Get the recording encoded for the ASR server. Encoded once, on first use.
+
+        Returns:
+            Tuple[bytes, str]: The encoded audio and its file name.
+        """
+        if self._payload is None:
+            self._payload = encode_for_upload(self.audio_data, self.samplerate, self.mix_weights)
+        return self._payload
+
+
+def encode_wav(audio_data: np.ndarray, samplerate: int = SAMPLE_RATE) -> bytes:
+    """
+    Encode audio as the WAV file saved to OUTPUT_FILE_NAME. The transcription cache key
+    is the hash of these bytes, for the recording in memory and for the saved file alike.
+
+    Args:
+        audio_data (np.ndarray): The audio data.
+        samplerate (int, optional): The sample rate of the audio. Defaults to SAMPLE_RATE.
+
+    Returns:
+        bytes: The WAV file.
+    """
+    buffer = io.BytesIO()
+    sf.write(buffer, audio_data, samplerate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def save_wav_file(wav: bytes, output_file_name: str = OUTPUT_FILE_NAME) -> None:
+    """
+    Save an encoded WAV file.
+
+    Args:
+        wav (bytes): The WAV file, see encode_wav.
+        output_file_name (str, optional): The output file name. Defaults to OUTPUT_FILE_NAME.
+    """
+    with tracing.span("audio.save"):
+        with open(output_file_name, "wb") as f:
+            f.write(wav)
+    logger.debug(f"Audio saved to: {output_file_name}...")
+
+
+def save_audio_file(
+    audio_data: np.ndarray, output_file_name: str = OUTPUT_FILE_NAME
+) -> None:
+    """
+    Save the audio data to a file.
+
+    Args:
+        audio_data (np.ndarray): The audio data.
+        output_file_name (str, optional): The output file name. Defaults to OUTPUT_FILE_NAME.
+    """
+    save_wav_file(encode_wav(audio_data), output_file_name)
+
+
+def encode_for_upload(
+    audio_data: np.ndarray, samplerate: int = SAMPLE_RATE, mix_weights: Optional[Tuple[float, ...]] = None
+) -> Tuple[bytes, str]:
+    """
+    Encode audio for the ASR server: downmix to mono, resample to UPLOAD_SAMPLE_RATE
+    and compress to UPLOAD_FORMAT.
+
+    Args:
+        audio_data (np.ndarray): The audio data.
+        samplerate (int, optional): The sample rate of the audio. Defaults to SAMPLE_RATE.
+        mix_weights (Optional[Tuple[float, ...]], optional): The weight of each channel in the mix.
+            Defaults to None, the average of the channels.
+
+    Returns:
+        Tuple[bytes, str]: The encoded audio and its file name.
+    """
+    with tracing.span("audio.encode", seconds=round(len(audio_data) / samplerate, 2)) as attrs:
+        mono: np.ndarray = resample(downmix(audio_data, mix_weights), samplerate, UPLOAD_SAMPLE_RATE)
+        payload, filename = encode_audio(mono, UPLOAD_SAMPLE_RATE, UPLOAD_FORMAT)
+        attrs["bytes"] = len(payload)
+    return payload, filename
+
+
+def load_for_upload(path_to_file: str = OUTPUT_FILE_NAME) -> Tuple[bytes, str]:
+    """
+    Read an audio file and encode it for the ASR server.
+
+    Args:
+        path_to_file (str, optional): Path to the audio file. Defaults to OUTPUT_FILE_NAME.
+
+    Returns:
+        Tuple[bytes, str]: The encoded audio and its file name.
+    """
+    audio_data, samplerate = sf.read(path_to_file, dtype="float32")
+    return encode_for_upload(audio_data, samplerate)
@@ -0,0 +1,176 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.config import RESPONSE_ARCHIVE_DIR, RESPONSE_ARCHIVE_KEEP, RESPONSE_FILE
+
+# Sections of the response file, in the order they are written
+ANSWER_KEYS = ("-QUICK_ANSWER-", "-FULL_ANSWER-")
+
+
+class ResponseWriter:
+    """
+    The only writer of the response file, running in its own thread.
+
+    Updates are queued by the GUI and applied in order. Updates of older generations
+    are dropped, so a late answer can never land in the file of a newer analysis.
+    Queued updates are coalesced into one write. When the new text only extends what
+    is already in the file, as while an answer streams, it is appended instead of
+    rewriting the file. The answers of previous analyses are kept in a per-session
+    archive, RESPONSE_ARCHIVE_KEEP sessions are kept.
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_FILE,
+        archive_dir: Optional[str] = RESPONSE_ARCHIVE_DIR,
+        archive_keep: int = RESPONSE_ARCHIVE_KEEP,
+    ) -> None:
+        self.path: str = path
+        self.archive_dir: Optional[str] = archive_dir
+        self.archive_keep: int = archive_keep
+        self.archive_path: Optional[str] = None
+        if archive_dir:
+            self.archive_path = os.path.join(archive_dir, time.strftime("%Y-%m-%d_%H-%M-%S") + ".md")
+
+        self._queue: "queue.Queue[Optional[Tuple[int, Optional[str], str]]]" = queue.Queue()
+        self._generation: int = -1
+        self._answers: Dict[str, str] = {}
+        # What the file holds now, so that streamed text can be appended
+        self._written: str = ""
+        self._thread = threading.Thread(target=self._run, name="response-writer", daemon=True)
+        self._thread.start()
+
+    def start(self, generation: int) -> None:
+        """
+        Start the answers of a new analysis. The previous ones are archived.
+
+        Args:
+            generation (int): The generation ID of the analysis.
+        """
+        self._queue.put((generation, None, ""))
+
+    def update(self, generation: int, key: str, answer: str) -> None:
+        """
+        Set the (possibly partial) text of an answer.
+
+        Args:
+            generation (int): The generation ID of the analysis.
+            key (str): The answer, one of ANSWER_KEYS.
+            answer (str): The answer text so far.
+        """
+        self._queue.put((generation, key, answer))
+
+    def close(self) -> None:
+        """
+        Write the queued updates and stop the thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        self._rotate_session()
+        closing: bool = False
+        while not closing:
+            commands: List[Optional[Tuple[int, Optional[str], str]]] = [self._queue.get()]
+            # Coalesce everything that queued up while the last write was running
+            while True:
+                try:
+                    commands.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for command in commands:
+                if command is None:
+                    closing = True
+                    continue
+                generation, key, answer = command
+                if generation < self._generation:
+                    continue
+                if key is None or generation > self._generation:
+                    self._new_generation(generation)
+                if key is not None:
+                    self._answers[key] = answer
+
+            try:
+                self._write()
+            except OSError as e:
+                logger.error(f"Can't write {self.path}: {e}")
+
+    def _new_generation(self, generation: int) -> None:
+        # Archived even if the answers never reached the file because the updates were coalesced
+        previous: str = self._text()
+        if previous:
+            self._archive(previous)
+        self._generation = generation
+        self._answers = {}
+
+    def _text(self) -> str:
+        return "".join(f"\n---\n{self._answers[key]}" for key in ANSWER_KEYS if self._answers.get(key))
+
+    def _write(self) -> None:
+        text: str = self._text()
+        if text == self._written:
+            return
+        if self._written and text.startswith(self._written):
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(text[len(self._written):])
+        else:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(text)
+        self._written = text
+
+    def _archive(self, text: str) -> None:
+        if not self.archive_path:
+            return
+        try:
+            with open(self.archive_path, "a", encoding="utf-8") as f:
+                f.write(f"\n\n## {time.strftime('%H:%M:%S')}\n{text}\n")
+        except OSError as e:
+            logger.error(f"Can't archive answers to {self.archive_path}: {e}")
+
+    def _rotate_session(self) -> None:
+        # The answers of the last session go to the archive before the file is reused
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                previous: str = f.read()
+        except OSError:
+            previous = ""
+
+        if not self.archive_dir:
+            return
+        try:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            if previous.strip():
+                self._archive(previous)
+            sessions: List[str] = sorted(name for name in os.listdir(self.archive_dir) if name.endswith(".md"))
+            for name in sessions[: max(0, len(sessions) - self.archive_keep)]:
+                os.remove(os.path.join(self.archive_dir, name))
+        except OSError as e:
+            logger.error(f"Can't rotate the response archive: {e}")
+
+
+_writer_lock = threading.Lock()
+_writer: Optional[ResponseWriter] = None
+
+
+def get_response_writer() -> ResponseWriter:
+    """
+    Get the process-wide response writer. Its thread starts, and the session is rotated,
+    on first use, not at import.
+
+    Returns:
+        ResponseWriter: The writer.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ResponseWriter()
+            atexit.register(_writer.close)
+        return _writer
@@ -1,5 +1,4 @@
 import FreeSimpleGUI as sg
-from PIL import ImageGrab
 
 
 class ScreenshotArea:
@@ -91,12 +90,15 @@ class ScreenshotArea:
 
         return False
 
-    def grab_area_screenshot(self, filename):
+    def grab_area_screenshot(self, filename=None):
         """
-        Делает скриншот текущей области окна и сохраняет его в файл.
+        Делает скриншот текущей области окна и возвращает его.
+        Если указан filename, также сохраняет его в файл.
         """
         if not self.window:
-            return
+            return None
+        from PIL import ImageGrab
+
         # Получаем положение и размеры окна screenshot_area
         x = self.window.TKroot.winfo_rootx()
         y = self.window.TKroot.winfo_rooty()
@@ -105,5 +107,7 @@ class ScreenshotArea:
 
         bbox = (x, y, x + w, y + h)
         screenshot = ImageGrab.grab(bbox)
-        screenshot.save(filename)
+        if filename:
+            screenshot.save(filename)
+        return screenshot
 
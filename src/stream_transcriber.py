@@ -0,0 +1,253 @@
+import asyncio
+import difflib
+import re
+from collections import deque
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, Deque, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from src import tracing
+from src.config import (
+    CHUNK_OVERLAP_SECONDS,
+    CHUNK_SECONDS,
+    SAMPLE_RATE,
+    SPECULATIVE_PAUSE,
+    VAD_ENABLED,
+    VAD_MAX_SILENCE,
+)
+from src.engine import AnalysisEngine
+from src.recording import encode_for_upload
+from utils.transcribe import atranscribe_audio_bytes
+from utils.vad import trailing_silence, trim_silence
+
+if TYPE_CHECKING:
+    from src.recording import Recording
+
+# How many words at the chunk boundary are compared when stitching
+MAX_OVERLAP_WORDS = 12
+# Recent audio checked for a pause, it must hold some speech and some silence
+PAUSE_WINDOW_SECONDS = 3
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def stitch_transcripts(previous: str, new: str) -> str:
+    """
+    Join two transcripts of overlapping audio chunks, dropping the words
+    that were recognized twice in the overlap.
+
+    Args:
+        previous (str): The transcript stitched so far.
+        new (str): The transcript of the next chunk.
+
+    Returns:
+        str: The stitched transcript.
+    """
+    previous_words: List[str] = previous.split()
+    new_words: List[str] = new.split()
+    if not previous_words:
+        return " ".join(new_words)
+    if not new_words:
+        return " ".join(previous_words)
+
+    tail = [_normalize(w) for w in previous_words[-MAX_OVERLAP_WORDS:]]
+    head = [_normalize(w) for w in new_words[:MAX_OVERLAP_WORDS]]
+
+    # Longest suffix of the previous transcript that is a prefix of the new one
+    overlap = 0
+    for size in range(min(len(tail), len(head)), 0, -1):
+        if tail[-size:] == head[:size]:
+            overlap = size
+            break
+
+    return " ".join(previous_words + new_words[overlap:])
+
+
+def transcript_similarity(a: str, b: str) -> float:
+    """
+    Compare two transcripts word by word, ignoring case and punctuation.
+
+    Args:
+        a (str): A transcript.
+        b (str): Another transcript.
+
+    Returns:
+        float: The similarity, from 0 to 1.
+    """
+    a_words: List[str] = [w for w in map(_normalize, a.split()) if w]
+    b_words: List[str] = [w for w in map(_normalize, b.split()) if w]
+    if not a_words and not b_words:
+        return 1.0
+    return difflib.SequenceMatcher(None, a_words, b_words, autojunk=False).ratio()
+
+
+class StreamingTranscriber:
+    """
+    Transcribe audio in overlapping chunks while it is still being recorded.
+
+    Frames are fed from the recording loop. Every time CHUNK_SECONDS of audio
+    are collected the chunk is closed and uploaded on the analysis engine loop.
+    Uploads may overlap, but results are stitched into the rolling partial
+    transcript in chunk order.
+
+    With `on_pause`, a pause after speech closes the chunk early, and `on_pause` is called
+    with the partial transcript once everything said before the pause is transcribed.
+    """
+
+    def __init__(
+        self,
+        engine: AnalysisEngine,
+        samplerate: int = SAMPLE_RATE,
+        chunk_seconds: float = CHUNK_SECONDS,
+        overlap_seconds: float = CHUNK_OVERLAP_SECONDS,
+        on_partial: Optional[Callable[[str], None]] = None,
+        on_pause: Optional[Callable[[str], None]] = None,
+        pause_seconds: float = SPECULATIVE_PAUSE,
+    ) -> None:
+        self.samplerate: int = samplerate
+        self.chunk_samples: int = int(chunk_seconds * samplerate)
+        self.overlap_samples: int = int(overlap_seconds * samplerate)
+        self.engine: AnalysisEngine = engine
+        self.on_partial = on_partial
+        self.on_pause = on_pause
+        self.pause_seconds: float = pause_seconds
+
+        self.partial_transcript: str = ""
+        # Channel weights of a multi-device recording, set by the recording loop
+        self.mix_weights: Optional[Tuple[float, ...]] = None
+        # The finished recording, set when recording stops
+        self.recording: Optional["Recording"] = None
+        self.closed: bool = False
+        self.failed: bool = False
+
+        self._pending: List[np.ndarray] = []
+        self._pending_samples: int = 0
+        self._tail: Optional[np.ndarray] = None
+        self._futures: List[Future] = []
+        # The task of the previous chunk, only touched on the engine loop
+        self._previous_task: Optional[asyncio.Task] = None
+        # The last seconds of audio, checked for a pause
+        self._recent: Deque[np.ndarray] = deque()
+        self._recent_samples: int = 0
+        self._in_pause: bool = False
+
+    def feed(self, frame: np.ndarray) -> None:
+        """
+        Add recorded audio. Closes and submits a chunk when enough audio is collected.
+
+        Args:
+            frame (np.ndarray): The recorded audio block.
+        """
+        if self.closed:
+            return
+        self._pending.append(frame)
+        self._pending_samples += len(frame)
+        if self.on_pause and self._detect_pause(frame):
+            logger.debug("Pause detected, transcribing what was said so far")
+            self._submit_chunk(pause=True)
+        elif self._pending_samples >= self.chunk_samples:
+            self._submit_chunk()
+
+    def _detect_pause(self, frame: np.ndarray) -> bool:
+        self._recent.append(frame)
+        self._recent_samples += len(frame)
+        while self._recent_samples - len(self._recent[0]) >= PAUSE_WINDOW_SECONDS * self.samplerate:
+            self._recent_samples -= len(self._recent.popleft())
+
+        recent: np.ndarray = np.vstack(self._recent)
+        silence: float = trailing_silence(recent, self.samplerate)
+        if silence < self.pause_seconds:
+            self._in_pause = False
+            return False
+        # Without any speech in the window there is nothing new to answer
+        if self._in_pause or silence >= len(recent) / self.samplerate:
+            return False
+        self._in_pause = True
+        return True
+
+    def close(self) -> None:
+        """
+        Submit the last, possibly short, chunk. Called when recording stops.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self._pending_samples:
+            self._submit_chunk()
+
+    async def transcript(self) -> str:
+        """
+        Wait for all submitted chunks and return the stitched transcript.
+        Must be awaited on the engine loop.
+
+        Returns:
+            str: The full transcript.
+
+        Raises:
+            RuntimeError: If any chunk failed to transcribe or was cancelled.
+        """
+        self.close()
+        # A superseded analysis must not cancel the uploads, a later one may still need them.
+        # Chunks cancelled by cancel() are returned, not raised, so only our own cancellation raises.
+        results: List[object] = await asyncio.shield(
+            asyncio.gather(*(asyncio.wrap_future(future) for future in self._futures), return_exceptions=True)
+        )
+        if any(isinstance(result, asyncio.CancelledError) for result in results):
+            self.failed = True
+        if self.failed:
+            raise RuntimeError("Streaming transcription failed")
+        return self.partial_transcript
+
+    def cancel(self) -> None:
+        """
+        Stop feeding and cancel the uploads that are still running.
+        """
+        self.closed = True
+        for future in self._futures:
+            future.cancel()
+
+    def _submit_chunk(self, pause: bool = False) -> None:
+        frames = self._pending if self._tail is None else [self._tail] + self._pending
+        chunk: np.ndarray = np.vstack(frames)
+        self._tail = chunk[-self.overlap_samples:] if self.overlap_samples else None
+        self._pending = []
+        self._pending_samples = 0
+        self._futures.append(self.engine.submit(self._transcribe_chunk(chunk, pause)))
+
+    async def _transcribe_chunk(self, chunk: np.ndarray, pause: bool = False) -> None:
+        # Tasks start in submission order, so this links each chunk to the previous one
+        previous: Optional[asyncio.Task] = self._previous_task
+        self._previous_task = asyncio.current_task()
+
+        if VAD_ENABLED:
+            trimmed: np.ndarray = trim_silence(chunk, self.samplerate, max_silence=VAD_MAX_SILENCE)
+            # Nothing detected is not proof of silence, upload the chunk as is like audio.trim_audio
+            if len(trimmed):
+                chunk = trimmed
+
+        try:
+            # An empty chunk, e.g. the last one after a stop on a block boundary, is not uploaded
+            text: str = ""
+            if len(chunk):
+                payload, filename = encode_for_upload(chunk, self.samplerate, self.mix_weights)
+                with tracing.span("asr.chunk", bytes=len(payload)):
+                    text = await atranscribe_audio_bytes(payload, filename)
+        except Exception as e:
+            logger.error(f"Can't transcribe audio chunk: {e}")
+            self.failed = True
+            return
+        finally:
+            # Stitch in chunk order
+            if previous:
+                await asyncio.wait([previous])
+
+        self.partial_transcript = stitch_transcripts(self.partial_transcript, text)
+        logger.debug(f"Partial transcript: {self.partial_transcript}")
+        if self.on_partial:
+            self.on_partial(self.partial_transcript)
+        if pause and self.on_pause and not self.closed and self.partial_transcript:
+            self.on_pause(self.partial_transcript)
@@ -0,0 +1,294 @@
+import atexit
+import contextlib
+import contextvars
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from loguru import logger
+
+from src.config import TRACE_JSONL_FILE, TRACE_PROMETHEUS_FILE
+
+# Stages shown in the status line: span name, label, and whether the first or the slowest one counts
+STATUS_STAGES: Tuple[Tuple[str, str, str], ...] = (
+    ("transcribe", "asr", "max"),
+    ("screenshot.encode", "ss", "max"),
+    ("llm.ttft", "ttft", "min"),
+    ("llm.generate", "gen", "max"),
+)
+TOKEN_ATTRS = ("prompt_tokens", "completion_tokens")
+
+T = TypeVar("T")
+
+
+@dataclass
+class Span:
+    """
+    A timed stage of the pipeline.
+
+    Attributes:
+        name (str): The stage, e.g. "asr.upload".
+        start (float): The UNIX time the stage started.
+        duration (float): The duration in seconds.
+        attrs (Dict[str, Any]): Extra data, e.g. token usage.
+        trace_id (Optional[str]): The trace the span belongs to.
+    """
+
+    name: str
+    start: float
+    duration: float
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    trace_id: Optional[str] = None
+
+
+class Trace:
+    """
+    The spans of one analysis or recording. Spans started in tasks and worker
+    threads of the analysis are collected through the context.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.id: str = uuid.uuid4().hex[:12]
+        self.spans: List[Span] = []
+        self.start: float = time.perf_counter()
+        self.duration: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def tokens(self) -> Dict[str, int]:
+        """
+        Sum the token usage of the spans.
+
+        Returns:
+            Dict[str, int]: Prompt and completion tokens.
+        """
+        with self._lock:
+            return {attr: sum(span.attrs.get(attr) or 0 for span in self.spans) for attr in TOKEN_ATTRS}
+
+    def summary(self) -> str:
+        """
+        Format the trace as a compact status line.
+
+        Returns:
+            str: E.g. "asr 0.61s · ttft 0.40s · gen 2.41s · 412 tok · total 3.05s".
+        """
+        with self._lock:
+            spans = list(self.spans)
+
+        parts: List[str] = []
+        for name, label, pick in STATUS_STAGES:
+            durations: List[float] = [span.duration for span in spans if span.name == name]
+            if durations:
+                parts.append(f"{label} {(min if pick == 'min' else max)(durations):.2f}s")
+        tokens: int = sum(self.tokens().values())
+        if tokens:
+            parts.append(f"{tokens} tok")
+        if self.duration is not None:
+            parts.append(f"total {self.duration:.2f}s")
+        return " · ".join(parts)
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+
+class SpanWriter:
+    """
+    Appends spans to the JSONL file from its own thread, so that recording a span on the
+    engine loop costs a queue put, not file IO. The file stays open, spans that queue up
+    while a batch is written go out with the next one.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._queue: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        self._queue.put(line)
+
+    def close(self) -> None:
+        """
+        Write the queued spans and stop the thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        try:
+            f = open(self.path, "a", encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Can't write spans to {self.path}: {e}")
+            # Spans are still recorded in memory, drop their lines
+            while self._queue.get() is not None:
+                pass
+            return
+        with f:
+            closing: bool = False
+            while not closing:
+                lines: List[Optional[str]] = [self._queue.get()]
+                while True:
+                    try:
+                        lines.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                closing = None in lines
+                try:
+                    f.writelines(line for line in lines if line is not None)
+                    f.flush()
+                except OSError as e:
+                    logger.warning(f"Can't write spans to {self.path}: {e}")
+
+
+_sink_lock = threading.Lock()
+# Started with the first span, not at import
+_span_writer: Optional[SpanWriter] = None
+# Prometheus aggregates: stage -> [count, sum of seconds], kind -> tokens
+_stage_totals: Dict[str, List[float]] = {}
+_token_totals: Dict[str, int] = {attr: 0 for attr in TOKEN_ATTRS}
+
+
+def current_trace() -> Optional[Trace]:
+    """
+    Get the trace of the running analysis.
+
+    Returns:
+        Optional[Trace]: The trace, or None outside of one.
+    """
+    return _current.get()
+
+
+@contextlib.contextmanager
+def trace(name: str) -> Iterator[Trace]:
+    """
+    Collect the spans of the block into a new trace. Its summary is logged at the end.
+
+    Args:
+        name (str): The name of the trace, e.g. "analysis".
+
+    Yields:
+        Trace: The trace.
+    """
+    new_trace = Trace(name)
+    token = _current.set(new_trace)
+    try:
+        yield new_trace
+    finally:
+        _current.reset(token)
+        new_trace.duration = time.perf_counter() - new_trace.start
+        logger.info(f"{name} {new_trace.id}: {new_trace.summary()}")
+        _write_prometheus()
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time the block as a span of the current trace.
+
+    Args:
+        name (str): The stage, e.g. "asr.upload".
+        **attrs: Extra data of the span.
+
+    Yields:
+        Dict[str, Any]: The attributes, more can be added inside the block.
+    """
+    start: float = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        record_span(name, time.perf_counter() - start, **attrs)
+
+
+def record_span(name: str, duration: float, **attrs: Any) -> None:
+    """
+    Record a span measured by the caller, e.g. the time to first token.
+
+    Args:
+        name (str): The stage.
+        duration (float): The duration in seconds.
+        **attrs: Extra data of the span.
+    """
+    active: Optional[Trace] = _current.get()
+    new_span = Span(name, time.time() - duration, duration, attrs, active.id if active else None)
+    if active:
+        active.add(new_span)
+
+    with _sink_lock:
+        totals = _stage_totals.setdefault(name, [0, 0.0])
+        totals[0] += 1
+        totals[1] += duration
+        for attr in TOKEN_ATTRS:
+            _token_totals[attr] += attrs.get(attr) or 0
+
+    if TRACE_JSONL_FILE:
+        _get_span_writer().write(json.dumps(asdict(new_span), ensure_ascii=False, default=str) + "\n")
+
+
+def _get_span_writer() -> SpanWriter:
+    global _span_writer
+    with _sink_lock:
+        if _span_writer is None:
+            _span_writer = SpanWriter(TRACE_JSONL_FILE)
+            atexit.register(_span_writer.close)
+        return _span_writer
+
+
+def _write_prometheus() -> None:
+    if not TRACE_PROMETHEUS_FILE:
+        return
+
+    with _sink_lock:
+        lines: List[str] = [
+            "# HELP hack_interview_stage_seconds Time spent in each pipeline stage.",
+            "# TYPE hack_interview_stage_seconds summary",
+        ]
+        for stage, (count, total) in sorted(_stage_totals.items()):
+            lines.append(f'hack_interview_stage_seconds_count{{stage="{stage}"}} {int(count)}')
+            lines.append(f'hack_interview_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines += [
+            "# HELP hack_interview_tokens_total Tokens used by completions.",
+            "# TYPE hack_interview_tokens_total counter",
+        ]
+        for kind, count in sorted(_token_totals.items()):
+            lines.append(f'hack_interview_tokens_total{{kind="{kind}"}} {count}')
+
+    # The textfile collector must never read a half written file
+    directory: str = os.path.dirname(os.path.abspath(TRACE_PROMETHEUS_FILE))
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=".metrics-", suffix=".tmp", dir=directory)
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, TRACE_PROMETHEUS_FILE)
+    except OSError as e:
+        logger.warning(f"Can't write metrics to {TRACE_PROMETHEUS_FILE}: {e}")
+
+
+async def timed(name: str, awaitable: Awaitable[T], **attrs: Any) -> T:
+    """
+    Await and time as a span of the current trace.
+
+    Args:
+        name (str): The stage.
+        awaitable (Awaitable[T]): The awaitable.
+        **attrs: Extra data of the span.
+
+    Returns:
+        T: The result of the awaitable.
+    """
+    with span(name, **attrs):
+        return await awaitable
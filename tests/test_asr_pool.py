@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from utils import asr_pool
+from utils.asr_pool import EndpointPool
+
+A, B, C = "http://a/asr", "http://b/asr", "http://c/asr"
+
+
+@pytest.fixture(autouse=True)
+def fast_hedging(monkeypatch):
+    monkeypatch.setattr(asr_pool, "ASR_HEDGE_MIN_DELAY", 0.01)
+    monkeypatch.setattr(asr_pool, "ASR_HEDGE_DEFAULT_DELAY", 0.05)
+
+
+def fake_calls(latencies, failing=()):
+    """
+    A fake async request per URL: sleeps its latency, then fails or returns the URL.
+    """
+    calls = []
+
+    async def call(url: str, timeout: float) -> str:
+        calls.append(url)
+        await asyncio.sleep(latencies.get(url, 0))
+        if url in failing:
+            raise ConnectionError(url)
+        return url
+
+    return call, calls
+
+
+def test_ranking_measures_unmeasured_endpoints_first():
+    pool = EndpointPool([A, B, C])
+    pool.record_success(pool.endpoints[0], 0.5)
+    pool.record_success(pool.endpoints[1], 0.2)
+    assert [e.url for e in pool.ranked()] == [C, B, A]
+
+
+def test_failed_endpoint_goes_last():
+    pool = EndpointPool([A, B])
+    pool.record_success(pool.endpoints[0], 0.1)
+    pool.record_success(pool.endpoints[1], 0.5)
+    pool.record_failure(pool.endpoints[0], ConnectionError())
+    assert [e.url for e in pool.ranked()] == [B, A]
+
+
+def test_run_fails_over():
+    pool = EndpointPool([A, B])
+
+    def call(url: str, timeout: float) -> str:
+        if url == A:
+            raise ConnectionError(url)
+        return url
+
+    assert pool.run(call) == B
+    assert not pool.endpoints[0].healthy
+    assert pool.endpoints[1].failures == 0
+
+
+def test_run_raises_when_every_endpoint_fails():
+    pool = EndpointPool([A, B])
+
+    def call(url: str, timeout: float) -> str:
+        raise ConnectionError(url)
+
+    with pytest.raises(ConnectionError):
+        pool.run(call)
+
+
+def test_arun_fails_over():
+    pool = EndpointPool([A, B], hedge=False)
+    call, calls = fake_calls({}, failing={A})
+    assert asyncio.run(pool.arun(call)) == B
+    assert calls == [A, B]
+
+
+def test_arun_hedges_to_the_next_endpoint():
+    pool = EndpointPool([A, B])
+    call, calls = fake_calls({A: 1.0, B: 0.01})
+    assert asyncio.run(pool.arun(call)) == B
+    assert calls == [A, B]
+
+
+def test_losing_a_hedge_never_ranks_an_endpoint_up():
+    pool = EndpointPool([A, B])
+    slow, fast = pool.endpoints
+    slow.ewma, fast.ewma = 1.0, 2.0
+    call, _ = fake_calls({A: 0.5, B: 0.01})
+
+    # A is tried first, B is hedged to after the default delay and wins, A is cancelled after about 0.06 s
+    assert asyncio.run(pool.arun(call)) == B
+    assert slow.ewma >= 1.0
+
+
+def test_slow_loser_is_ranked_down():
+    pool = EndpointPool([A, B])
+    slow, fast = pool.endpoints
+    slow.ewma, fast.ewma = 0.01, 0.02
+    call, _ = fake_calls({A: 1.0, B: 0.01})
+
+    assert asyncio.run(pool.arun(call)) == B
+    # Cancelled after the hedge delay and B's latency, much slower than its EWMA said
+    assert slow.ewma > fast.ewma
+    assert [e.url for e in pool.ranked()] == [B, A]
@@ -0,0 +1,28 @@
+import pytest
+
+from utils.list_models import model_capabilities
+
+
+@pytest.mark.parametrize(
+    "model, vision",
+    [
+        ("gpt-4o", True),
+        ("gpt-4o-mini", True),
+        ("o1", True),
+        ("o1-2024-12-17", True),
+        ("o1-preview", False),
+        ("o1-preview-2024-09-12", False),
+        ("o1-mini", False),
+        ("o3-mini", False),
+        ("gpt-3.5-turbo", False),
+        ("gpt-4-turbo", True),
+        ("gpt-4-turbo-2024-04-09", True),
+        ("gpt-4-turbo-preview", False),
+    ],
+)
+def test_vision_capability(model, vision):
+    assert model_capabilities(model) == {"chat": True, "vision": vision}
+
+
+def test_non_chat_models_have_no_vision():
+    assert model_capabilities("whisper-1") == {"chat": False, "vision": False}
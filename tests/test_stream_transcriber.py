@@ -0,0 +1,49 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src import stream_transcriber
+from src.engine import AnalysisEngine
+from src.stream_transcriber import StreamingTranscriber
+
+SAMPLE_RATE = 16000
+
+
+@pytest.fixture
+def engine():
+    engine = AnalysisEngine()
+    yield engine
+    engine.stop()
+
+
+def test_cancel_during_transcript_raises_runtime_error(engine, monkeypatch):
+    started = asyncio.Event()
+
+    async def slow_transcribe(audio: bytes, filename: str) -> str:
+        started.set()
+        await asyncio.sleep(10)
+        return "never"
+
+    monkeypatch.setattr(stream_transcriber, "VAD_ENABLED", False)
+    monkeypatch.setattr(stream_transcriber, "atranscribe_audio_bytes", slow_transcribe)
+    monkeypatch.setattr(stream_transcriber, "encode_for_upload", lambda *args: (b"audio", "record.wav"))
+
+    transcriber = StreamingTranscriber(engine, samplerate=SAMPLE_RATE, chunk_seconds=1, overlap_seconds=0)
+    transcriber.feed(np.zeros((SAMPLE_RATE, 1), dtype=np.float32))
+    transcriber.close()
+
+    async def wait_and_cancel() -> None:
+        await started.wait()
+        # What the GUI thread does when the next recording starts
+        transcriber.cancel()
+
+    async def analysis() -> str:
+        asyncio.ensure_future(wait_and_cancel())
+        return await transcriber.transcript()
+
+    future = asyncio.run_coroutine_threadsafe(analysis(), engine.loop)
+    # The analysis gets an error it can fall back from, not its own cancellation
+    with pytest.raises(RuntimeError):
+        future.result(timeout=5)
+    assert transcriber.failed
@@ -0,0 +1,54 @@
+import numpy as np
+
+from utils.vad import trailing_silence, trim_silence
+
+SAMPLE_RATE = 16000
+
+
+def voiced(seconds: float, amplitude: float = 0.1, dip: float = 0.7) -> np.ndarray:
+    """
+    Continuous speech-like audio: a harmonic signal with syllable-rate loudness dips
+    that never reach silence.
+    """
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    harmonics = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 1 - (1 - dip) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    return (amplitude * envelope * harmonics / 2).astype(np.float32)
+
+
+def test_continuous_speech_is_kept():
+    audio = voiced(3.0)
+    assert len(trim_silence(audio, SAMPLE_RATE)) == len(audio)
+
+
+def test_steady_tone_is_kept():
+    t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+    audio = (0.2 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    assert len(trim_silence(audio, SAMPLE_RATE)) == len(audio)
+
+
+def test_speech_over_steady_noise_is_kept():
+    rng = np.random.default_rng(0)
+    audio = voiced(3.0) + (0.05 * rng.standard_normal(3 * SAMPLE_RATE)).astype(np.float32)
+    assert len(trim_silence(audio, SAMPLE_RATE)) == len(audio)
+
+
+def test_pure_silence_is_trimmed():
+    assert len(trim_silence(np.zeros(2 * SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)) == 0
+    rng = np.random.default_rng(0)
+    hiss = (1e-4 * rng.standard_normal(2 * SAMPLE_RATE)).astype(np.float32)
+    assert len(trim_silence(hiss, SAMPLE_RATE)) == 0
+
+
+def test_long_pause_is_shortened():
+    pause = np.zeros(2 * SAMPLE_RATE, dtype=np.float32)
+    audio = np.concatenate((voiced(1.0), pause, voiced(1.0)))
+    trimmed = trim_silence(audio, SAMPLE_RATE, max_silence=0.5)
+    assert 2 * SAMPLE_RATE <= len(trimmed) < 3 * SAMPLE_RATE
+
+
+def test_trailing_silence_after_continuous_speech():
+    audio = np.concatenate((voiced(2.0), np.zeros(SAMPLE_RATE, dtype=np.float32)))
+    assert 0.9 <= trailing_silence(audio, SAMPLE_RATE) <= 1.0
@@ -0,0 +1,239 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple, TypeVar
+
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+# Per-attempt timeout, a hung server fails over instead of stalling the analysis
+ASR_TIMEOUT: float = float(os.getenv("ASR_TIMEOUT", "30"))  # seconds
+# Send a duplicate request to the next endpoint when the first is slower than its p95
+ASR_HEDGE: bool = os.getenv("ASR_HEDGE", "true").lower() in ("1", "true", "yes")
+ASR_HEDGE_MIN_DELAY: float = float(os.getenv("ASR_HEDGE_MIN_DELAY", "0.5"))  # seconds
+ASR_HEDGE_DEFAULT_DELAY: float = float(os.getenv("ASR_HEDGE_DEFAULT_DELAY", "3"))  # seconds, until p95 is known
+
+EWMA_ALPHA = 0.3
+LATENCY_SAMPLES = 50
+MIN_P95_SAMPLES = 5
+# Failed endpoints are skipped for a cooldown that doubles with every failure in a row
+COOLDOWN_BASE = 5.0  # seconds
+COOLDOWN_MAX = 120.0  # seconds
+
+T = TypeVar("T")
+
+
+class Endpoint:
+    """
+    An ASR server and its health.
+
+    Attributes:
+        url (str): The URL.
+        ewma (Optional[float]): Exponentially weighted moving average of the latency in seconds.
+        samples (Deque[float]): The latest latencies in seconds.
+        failures (int): Failures in a row.
+        down_until (float): The monotonic time until which the endpoint is skipped.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url: str = url
+        self.ewma: Optional[float] = None
+        self.samples: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.failures: int = 0
+        self.down_until: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def p95(self) -> Optional[float]:
+        """
+        Get the 95th percentile of the latest latencies.
+
+        Returns:
+            Optional[float]: The latency in seconds, or None with too few samples.
+        """
+        if len(self.samples) < MIN_P95_SAMPLES:
+            return None
+        ordered: List[float] = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class EndpointPool:
+    """
+    A pool of equivalent ASR servers.
+
+    Requests go to the healthy endpoint with the lowest latency EWMA, endpoints without
+    measurements first so that every one gets measured. A failed request fails over to
+    the next endpoint and puts the failed one on cooldown. In async requests, when the
+    first endpoint takes longer than its p95, a hedged duplicate is sent to the next one,
+    the first response wins and the other request is cancelled.
+    """
+
+    def __init__(self, urls: List[str], timeout: float = ASR_TIMEOUT, hedge: bool = ASR_HEDGE) -> None:
+        if not urls:
+            raise ValueError("The ASR endpoint pool needs at least one URL")
+        self.endpoints: List[Endpoint] = [Endpoint(url) for url in urls]
+        self.timeout: float = timeout
+        self.hedge: bool = hedge and len(urls) > 1
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def ranked(self) -> List[Endpoint]:
+        """
+        Get the endpoints in the order they are tried: healthy ones by latency,
+        then those on cooldown by the time they come back.
+
+        Returns:
+            List[Endpoint]: The endpoints.
+        """
+        with self._lock:
+            healthy = sorted(
+                (e for e in self.endpoints if e.healthy), key=lambda e: e.ewma if e.ewma is not None else -1.0
+            )
+            down = sorted((e for e in self.endpoints if not e.healthy), key=lambda e: e.down_until)
+        return healthy + down
+
+    def record_latency(self, endpoint: Endpoint, latency: float) -> None:
+        with self._lock:
+            endpoint.ewma = latency if endpoint.ewma is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * endpoint.ewma
+            endpoint.samples.append(latency)
+
+    def record_censored(self, endpoint: Endpoint, elapsed: float) -> None:
+        """
+        Record a request cancelled after `elapsed`. It would have taken at least that long,
+        so the latency is recorded as no less than the current EWMA: losing a hedge can
+        rank an endpoint down, never up.
+        """
+        with self._lock:
+            current: float = endpoint.ewma if endpoint.ewma is not None else 0.0
+        self.record_latency(endpoint, max(elapsed, current))
+
+    def record_success(self, endpoint: Endpoint, latency: float) -> None:
+        self.record_latency(endpoint, latency)
+        with self._lock:
+            endpoint.failures = 0
+            endpoint.down_until = 0.0
+
+    def record_failure(self, endpoint: Endpoint, error: BaseException) -> None:
+        with self._lock:
+            endpoint.failures += 1
+            cooldown: float = min(COOLDOWN_MAX, COOLDOWN_BASE * 2 ** (endpoint.failures - 1))
+            endpoint.down_until = time.monotonic() + cooldown
+        logger.warning(f"ASR endpoint {endpoint.url} failed: {error!r}, skipping it for {cooldown:.0f} s")
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        """
+        Get how long to wait for an endpoint before sending a hedged request.
+
+        Args:
+            endpoint (Endpoint): The endpoint.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        with self._lock:
+            p95: Optional[float] = endpoint.p95()
+        return max(ASR_HEDGE_MIN_DELAY, p95 if p95 is not None else ASR_HEDGE_DEFAULT_DELAY)
+
+    def run(self, call: Callable[[str, float], T]) -> T:
+        """
+        Send a blocking request, failing over to the next endpoint on error. Not hedged.
+
+        Args:
+            call (Callable[[str, float], T]): Sends the request to a URL with a timeout.
+
+        Returns:
+            T: The result of the first successful request.
+        """
+        error: Optional[BaseException] = None
+        for endpoint in self.ranked():
+            start: float = time.perf_counter()
+            try:
+                result: T = call(endpoint.url, self.timeout)
+            except Exception as e:
+                self.record_failure(endpoint, e)
+                error = e
+                continue
+            self.record_success(endpoint, time.perf_counter() - start)
+            return result
+        raise error
+
+    async def arun(self, call: Callable[[str, float], Awaitable[T]]) -> T:
+        """
+        Send a request with failover and hedging.
+
+        Args:
+            call (Callable[[str, float], Awaitable[T]]): Sends the request to a URL with a timeout.
+
+        Returns:
+            T: The result of the first successful request.
+        """
+        remaining: List[Endpoint] = self.ranked()
+        # Request -> endpoint and start time
+        running: Dict[asyncio.Task, Tuple[Endpoint, float]] = {}
+        error: Optional[BaseException] = None
+        won: bool = False
+
+        def launch() -> None:
+            endpoint: Endpoint = remaining.pop(0)
+            running[asyncio.ensure_future(self._attempt(endpoint, call))] = endpoint, time.perf_counter()
+
+        hedge_delay: Optional[float] = self.hedge_delay(remaining[0]) if self.hedge else None
+        launch()
+        try:
+            while running:
+                done: Set[asyncio.Task]
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=hedge_delay if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    logger.debug(f"ASR request slower than {hedge_delay:.2f} s, hedging to {remaining[0].url}")
+                    launch()
+                    # One hedge per request
+                    hedge_delay = None
+                    continue
+
+                for task in done:
+                    running.pop(task)
+                    if task.exception() is None:
+                        won = True
+                        return task.result()
+                    error = task.exception()
+                    # Fail over right away, the failed request is replaced by one to the next endpoint
+                    if remaining:
+                        launch()
+            raise error
+        finally:
+            # The losing request is cancelled, which closes its connection
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            # Without it a slow endpoint that always loses would never be ranked down
+            if won:
+                now: float = time.perf_counter()
+                for endpoint, start in running.values():
+                    self.record_censored(endpoint, now - start)
+
+    async def _attempt(self, endpoint: Endpoint, call: Callable[[str, float], Awaitable[T]]) -> T:
+        start: float = time.perf_counter()
+        try:
+            result: T = await asyncio.wait_for(call(endpoint.url, self.timeout), self.timeout)
+        except asyncio.CancelledError:
+            # Lost the race, see arun, or the analysis was cancelled
+            raise
+        except Exception as e:
+            self.record_failure(endpoint, e)
+            raise
+        self.record_success(endpoint, time.perf_counter() - start)
+        return result
@@ -0,0 +1,105 @@
+import io
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import soundfile as sf
+
+# soundfile format and subtype of each upload format, and the file extension sent to the server
+UPLOAD_FORMATS = {
+    "wav": ("WAV", "PCM_16", "wav"),
+    "flac": ("FLAC", "PCM_16", "flac"),
+    "opus": ("OGG", "OPUS", "ogg"),
+}
+
+# Taps of the resampling filter per polyphase branch of the slower rate
+RESAMPLE_TAPS = 16
+# Output samples computed at once, bounds the memory of the window matrix
+RESAMPLE_BLOCK = 16384
+
+
+def downmix(audio: np.ndarray, weights: Optional[Sequence[float]] = None) -> np.ndarray:
+    """
+    Mix all channels down to mono.
+
+    Args:
+        audio (np.ndarray): The audio data, (samples,) or (samples, channels).
+        weights (Optional[Sequence[float]], optional): The weight of each channel, normalized
+            to sum to 1. Defaults to None, the average of the channels.
+
+    Returns:
+        np.ndarray: The mono float32 audio data, (samples,).
+    """
+    if audio.ndim > 1:
+        if weights is None or audio.shape[1] != len(weights):
+            audio = audio.mean(axis=1)
+        else:
+            gains: np.ndarray = np.asarray(weights, dtype=np.float32)
+            audio = audio @ (gains / gains.sum())
+    return audio.astype(np.float32, copy=False)
+
+
+def resample(audio: np.ndarray, orig_rate: int, target_rate: int, taps: int = RESAMPLE_TAPS) -> np.ndarray:
+    """
+    Resample mono audio with a polyphase Kaiser-windowed sinc filter.
+    Only the output samples are computed, each from its own branch of the filter.
+
+    Args:
+        audio (np.ndarray): The mono audio data, (samples,).
+        orig_rate (int): The sample rate of the audio.
+        target_rate (int): The sample rate to resample to.
+        taps (int, optional): Filter taps per branch. Defaults to RESAMPLE_TAPS.
+
+    Returns:
+        np.ndarray: The resampled float32 audio data.
+    """
+    divisor: int = math.gcd(orig_rate, target_rate)
+    up: int = target_rate // divisor
+    down: int = orig_rate // divisor
+    x: np.ndarray = audio.astype(np.float32, copy=False)
+    if up == down or not len(x):
+        return x
+
+    # Low-pass at the lower of the two Nyquist frequencies, gain `up` for the zero-stuffed input
+    max_rate: int = max(up, down)
+    half: int = taps * max_rate
+    n: np.ndarray = np.arange(-half, half + 1)
+    h: np.ndarray = (up / max_rate) * np.sinc(n / max_rate) * np.kaiser(2 * half + 1, 8.0)
+    h = np.concatenate((h, np.zeros(-len(h) % up))).astype(np.float32)
+    branch_len: int = len(h) // up
+
+    # y[m] = sum_k h[phase + k * up] * x[base - k], with base, phase = divmod(m * down + half, up)
+    padded: np.ndarray = np.concatenate((np.zeros(branch_len, np.float32), x, np.zeros(branch_len, np.float32)))
+    windows: np.ndarray = np.lib.stride_tricks.sliding_window_view(padded, branch_len)
+    out_len: int = math.ceil(len(x) * up / down)
+    out: np.ndarray = np.empty(out_len, dtype=np.float32)
+
+    # Outputs m, m + up, m + 2 * up, ... share the same filter branch
+    for first in range(min(up, out_len)):
+        phase: int = (first * down + half) % up
+        branch: np.ndarray = h[phase::up][::-1]
+        positions: np.ndarray = np.arange(first, out_len, up)
+        starts: np.ndarray = (positions * down + half) // up + 1
+        for block in range(0, len(positions), RESAMPLE_BLOCK):
+            index = slice(block, block + RESAMPLE_BLOCK)
+            out[positions[index]] = windows[starts[index]] @ branch
+
+    return out
+
+
+def encode_audio(audio: np.ndarray, samplerate: int, upload_format: str = "flac") -> Tuple[bytes, str]:
+    """
+    Encode audio in memory.
+
+    Args:
+        audio (np.ndarray): The audio data.
+        samplerate (int): The sample rate.
+        upload_format (str, optional): One of UPLOAD_FORMATS. Defaults to "flac".
+
+    Returns:
+        Tuple[bytes, str]: The encoded audio and its file name.
+    """
+    file_format, subtype, extension = UPLOAD_FORMATS[upload_format]
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, samplerate, format=file_format, subtype=subtype)
+    return buffer.getvalue(), f"record.{extension}"
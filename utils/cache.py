@@ -1,6 +1,10 @@
+import atexit
+import contextlib
 import json
 import os
-from typing import Dict, List, Any, Optional
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Set
 
 CACHE_FILE = "cache.json"
 DEFAULT_CACHE = {
@@ -8,39 +12,214 @@ DEFAULT_CACHE = {
     "default_model": None,
     "default_position": "Python Developer"
 }
+# Writes within this many seconds of each other are flushed together
+FLUSH_DELAY = 0.5
+
+
+@contextlib.contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """
+    Hold an exclusive lock on a lock file next to the settings file, across processes.
+
+    Args:
+        path (str): The path of the lock file.
+    """
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class Settings:
+    """
+    A JSON settings file loaded once and served from memory.
+
+    Writes update memory right away and are flushed in the background after
+    FLUSH_DELAY, so bursts of changes cost one write. A flush re-reads the file
+    under a file lock and only overwrites the keys changed by this process, so
+    another instance of the app keeps its changes. The file is replaced
+    atomically, a crash never leaves it half written.
+    """
+
+    def __init__(self, path: str, defaults: Dict[str, Any], flush_delay: float = FLUSH_DELAY) -> None:
+        self.path: str = path
+        self.defaults: Dict[str, Any] = defaults
+        self.flush_delay: float = flush_delay
+
+        self._lock = threading.RLock()
+        # Serializes flushes, get and set only wait for self._lock
+        self._flush_lock = threading.Lock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._dirty: Set[str] = set()
+        self._timer: Optional[threading.Timer] = None
+
+    def _read_file(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # A missing or corrupted file falls back to the defaults
+            return dict(self.defaults)
+        return data if isinstance(data, dict) else dict(self.defaults)
+
+    def _loaded(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = self._read_file()
+        return self._data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get a setting from memory.
+
+        Args:
+            key (str): The setting.
+            default (Any, optional): Returned if the setting is missing. Defaults to None.
+
+        Returns:
+            Any: The value.
+        """
+        with self._lock:
+            return self._loaded().get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Change a setting in memory and schedule a flush.
+
+        Args:
+            key (str): The setting.
+            value (Any): The value.
+        """
+        with self._lock:
+            data = self._loaded()
+            if key in data and data[key] == value:
+                return
+            data[key] = value
+            self._dirty.add(key)
+            self._schedule_flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a copy of all settings.
+
+        Returns:
+            Dict[str, Any]: The settings.
+        """
+        with self._lock:
+            return json.loads(json.dumps(self._loaded()))
+
+    def replace(self, data: Dict[str, Any]) -> None:
+        """
+        Replace all settings and schedule a flush.
+
+        Args:
+            data (Dict[str, Any]): The settings.
+        """
+        with self._lock:
+            self._data = dict(data)
+            self._dirty.update(self._data)
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.flush_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> None:
+        """
+        Write the changed settings to the file now.
+        """
+        with self._flush_lock:
+            # Only the snapshot is taken under the lock, the disk IO runs outside it
+            with self._lock:
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty and os.path.exists(self.path):
+                    return
+                data = self._loaded()
+                written: Dict[str, Any] = json.loads(
+                    json.dumps({key: data[key] for key in self._dirty if key in data})
+                )
+
+            with _file_lock(self.path + ".lock"):
+                # Merge into the file as it is now, it may have been changed by another instance
+                merged: Dict[str, Any] = self._read_file()
+                merged.update(written)
+                self._atomic_write(merged)
+
+            with self._lock:
+                data = self._loaded()
+                # Keys changed while writing stay dirty and keep their new value
+                for key, value in written.items():
+                    if data.get(key) == value:
+                        self._dirty.discard(key)
+                for key in self._dirty:
+                    if key in data:
+                        merged[key] = data[key]
+                # Pick up the settings of other instances
+                self._data = merged
+
+    def _atomic_write(self, data: Dict[str, Any]) -> None:
+        directory: str = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".cache-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+
+settings = Settings(CACHE_FILE, DEFAULT_CACHE)
+# Pending writes are flushed when the app exits
+atexit.register(settings.flush)
+
 
 def ensure_cache_exists() -> None:
     """
     Ensure that the cache file exists. If it doesn't, create it with default values.
     """
     if not os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, "w") as f:
-            json.dump(DEFAULT_CACHE, f, indent=2)
+        settings.flush()
 
 def read_cache() -> Dict[str, Any]:
     """
-    Read the cache file and return its contents.
+    Read the cache and return its contents.
 
     Returns:
-        Dict[str, Any]: The contents of the cache file.
+        Dict[str, Any]: A copy of the cached settings.
     """
-    ensure_cache_exists()
-    try:
-        with open(CACHE_FILE, "r") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        # If the file is corrupted, return default cache
-        return DEFAULT_CACHE.copy()
+    return settings.snapshot()
 
 def write_cache(cache_data: Dict[str, Any]) -> None:
     """
-    Write the given data to the cache file.
+    Write the given data to the cache. The file is updated in the background.
 
     Args:
         cache_data (Dict[str, Any]): The data to write to the cache file.
     """
-    with open(CACHE_FILE, "w") as f:
-        json.dump(cache_data, f, indent=2)
+    settings.replace(cache_data)
 
 def get_cached_models() -> List[str]:
     """
@@ -49,8 +228,7 @@ def get_cached_models() -> List[str]:
     Returns:
         List[str]: The list of models.
     """
-    cache = read_cache()
-    return cache.get("models", [])
+    return list(settings.get("models", []))
 
 def set_cached_models(models: List[str]) -> None:
     """
@@ -59,9 +237,7 @@ def set_cached_models(models: List[str]) -> None:
     Args:
         models (List[str]): The list of models to cache.
     """
-    cache = read_cache()
-    cache["models"] = models
-    write_cache(cache)
+    settings.set("models", list(models))
 
 def get_default_model() -> Optional[str]:
     """
@@ -70,8 +246,7 @@ def get_default_model() -> Optional[str]:
     Returns:
         Optional[str]: The default model, or None if not set.
     """
-    cache = read_cache()
-    return cache.get("default_model")
+    return settings.get("default_model")
 
 def set_default_model(model: str) -> None:
     """
@@ -80,9 +255,7 @@ def set_default_model(model: str) -> None:
     Args:
         model (str): The model to set as default.
     """
-    cache = read_cache()
-    cache["default_model"] = model
-    write_cache(cache)
+    settings.set("default_model", model)
 
 def get_default_position() -> str:
     """
@@ -91,8 +264,7 @@ def get_default_position() -> str:
     Returns:
         str: The default position.
     """
-    cache = read_cache()
-    return cache.get("default_position", "Python Developer")
+    return settings.get("default_position", "Python Developer")
 
 def set_default_position(position: str) -> None:
     """
@@ -101,6 +273,33 @@ def set_default_position(position: str) -> None:
     Args:
         position (str): The position to set as default.
     """
-    cache = read_cache()
-    cache["default_position"] = position
-    write_cache(cache)
+    settings.set("default_position", position)
+
+def get_model_catalog() -> Dict[str, Dict[str, bool]]:
+    """
+    Get the capabilities of every known model from the cache.
+
+    Returns:
+        Dict[str, Dict[str, bool]]: The capability flags by model ID.
+    """
+    return dict(settings.get("model_catalog", {}))
+
+def get_models_updated_at() -> float:
+    """
+    Get the time the models were last fetched.
+
+    Returns:
+        float: The UNIX time, 0 if never.
+    """
+    return settings.get("models_updated_at", 0.0)
+
+def set_model_catalog(catalog: Dict[str, Dict[str, bool]], updated_at: float) -> None:
+    """
+    Set the capabilities of every known model in the cache.
+
+    Args:
+        catalog (Dict[str, Dict[str, bool]]): The capability flags by model ID.
+        updated_at (float): The UNIX time the models were fetched.
+    """
+    settings.set("model_catalog", catalog)
+    settings.set("models_updated_at", updated_at)
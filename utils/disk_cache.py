@@ -0,0 +1,127 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class DiskCache:
+    """
+    A persistent string cache in an SQLite file, bounded in entries and bytes.
+    The least recently used entries are evicted first. With a TTL, entries
+    older than it are treated as missing and removed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 1000,
+        max_bytes: int = 10 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.path: str = path
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.ttl: Optional[float] = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL, "
+            "created REAL NOT NULL DEFAULT 0)"
+        )
+        # Caches created before TTL support have no creation time
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+        if "created" not in columns:
+            self._conn.execute("ALTER TABLE entries ADD COLUMN created REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Build a cache key from JSON-serializable parts.
+
+        Returns:
+            str: The SHA-256 hex digest of the parts.
+        """
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a value and mark it as recently used.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            Optional[str]: The value, or None on a miss or if the entry expired.
+        """
+        now: float = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a value and evict the least recently used entries over the bounds.
+
+        Args:
+            key (str): The key.
+            value (str): The value.
+        """
+        now: float = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed, created) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+
+        count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+
+        # Walk from the least recently used entry until both bounds hold
+        evicted = []
+        for key, entry_size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            evicted.append((key,))
+            count -= 1
+            size -= entry_size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the hit and miss counters and the size of the cache.
+
+        Returns:
+            Dict[str, int]: hits, misses, entries and bytes.
+        """
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": size}
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
@@ -1,6 +1,85 @@
 import base64
+import io
+import math
+from typing import Optional
+
+from PIL import Image
+
+# Vision models see images in 512 px tiles, each tile costs TILE_TOKENS on top of BASE_TOKENS
+TILE_SIZE = 512
+TILE_TOKENS = 170
+BASE_TOKENS = 85
 
 
 def encode_image(image_path):
     with open(image_path, 'rb') as image_file:
         return base64.b64encode(image_file.read()).decode('utf-8')
+
+
+def image_tokens(width: int, height: int) -> int:
+    """
+    Estimate the input tokens of an image for a vision model.
+
+    Args:
+        width (int): The image width.
+        height (int): The image height.
+
+    Returns:
+        int: The estimated tokens.
+    """
+    return BASE_TOKENS + TILE_TOKENS * math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+
+
+def downscale(image: Image.Image, max_side: Optional[int] = None, max_tokens: Optional[int] = None) -> Image.Image:
+    """
+    Downscale the image to fit the longest side and the token budget, keeping the aspect ratio.
+
+    Args:
+        image (Image.Image): The image.
+        max_side (Optional[int], optional): The longest side in pixels. Defaults to None.
+        max_tokens (Optional[int], optional): The token budget. Defaults to None.
+
+    Returns:
+        Image.Image: The downscaled image, or the same image if it already fits.
+    """
+    width, height = image.size
+    scale: float = 1.0
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+    if max_tokens:
+        while scale > 0.05 and image_tokens(int(width * scale), int(height * scale)) > max_tokens:
+            scale *= 0.9
+
+    if scale >= 1.0:
+        return image
+    return image.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.Resampling.LANCZOS)
+
+
+def encode_image_data_url(
+    image: Image.Image,
+    image_format: str = "JPEG",
+    quality: int = 85,
+    max_side: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """
+    Downscale and encode the image in memory as a base64 data URL.
+
+    Args:
+        image (Image.Image): The image.
+        image_format (str, optional): "JPEG", "WEBP" or "PNG". Defaults to "JPEG".
+        quality (int, optional): The JPEG or WebP quality. Defaults to 85.
+        max_side (Optional[int], optional): The longest side in pixels. Defaults to None.
+        max_tokens (Optional[int], optional): The token budget. Defaults to None.
+
+    Returns:
+        str: The data URL.
+    """
+    image = downscale(image, max_side, max_tokens)
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=quality)
+    encoded: str = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    return f"data:image/{image_format.lower()};base64,{encoded}"
@@ -1,11 +1,75 @@
-from openai import OpenAI
+import re
+import time
+from typing import Dict, List
+
 from dotenv import load_dotenv
-from utils.cache import get_cached_models, set_cached_models
+from loguru import logger
+
+from utils.cache import (
+    get_cached_models,
+    get_model_catalog,
+    get_models_updated_at,
+    set_cached_models,
+    set_model_catalog,
+)
+
+# The catalog is refreshed in the background once it is older than this
+MODELS_TTL = 24 * 60 * 60  # seconds
+
+# Models served by the API that don't take chat completions
+NON_CHAT_PATTERN = re.compile(
+    r"embedding|tts|whisper|transcribe|dall-e|gpt-image|moderation|realtime|audio|search|"
+    r"^(davinci|babbage|ada|curie|sora|codex|computer-use)"
+)
+# Chat models that accept images
+VISION_PATTERN = re.compile(
+    r"gpt-4o|gpt-4\.1|gpt-4\.5|gpt-4-turbo(?!-preview)|gpt-4-vision|gpt-5|^o1(?!-mini|-preview)|^o3(?!-mini)|^o4|"
+    r"vision|llava|-vl"
+)
+
+
+def model_capabilities(model: str) -> Dict[str, bool]:
+    """
+    Guess the capabilities of a model from its ID, the models endpoint doesn't report them.
+
+    Args:
+        model (str): The model ID.
+
+    Returns:
+        Dict[str, bool]: The "chat" and "vision" flags.
+    """
+    name: str = model.lower()
+    chat: bool = not NON_CHAT_PATTERN.search(name)
+    return {"chat": chat, "vision": chat and bool(VISION_PATTERN.search(name))}
+
+
+def supports_vision(model: str) -> bool:
+    """
+    Check if the model accepts images, from the catalog or from its ID.
+
+    Args:
+        model (str): The model ID.
+
+    Returns:
+        bool: Whether the model accepts images.
+    """
+    capabilities: Dict[str, bool] = get_model_catalog().get(model) or model_capabilities(model)
+    return capabilities["vision"]
+
+
+def models_expired() -> bool:
+    """
+    Check if the cached catalog is older than MODELS_TTL.
+
+    Returns:
+        bool: Whether the catalog should be refreshed.
+    """
+    return time.time() - get_models_updated_at() > MODELS_TTL
 
 
 def get_models(use_cache=True):
     """
-    Get the list of available models.
+    Get the list of available chat models.
 
     Args:
         use_cache (bool, optional): Whether to use cached models. Defaults to True.
@@ -20,19 +84,24 @@ def get_models(use_cache=True):
             return cached_models
 
     # Otherwise, fetch models from the API
-    models = []
     load_dotenv()
-    client = OpenAI()
-    try:
-        ms = client.models.list()
-        for model in ms:
-            models.append(model.id)
+    from utils.transport import get_openai_client
 
-        # Cache the models for future use
-        set_cached_models(models)
+    client = get_openai_client()
+    try:
+        ids: List[str] = [model.id for model in client.models.list()]
     except Exception as e:
-        print(f"Error fetching models: {e}")
+        # Keep the old catalog, an empty list would wipe the model selection
+        logger.error(f"Error fetching models: {e}")
+        return get_cached_models()
+
+    catalog: Dict[str, Dict[str, bool]] = {model: model_capabilities(model) for model in ids}
+    models: List[str] = sorted(model for model in ids if catalog[model]["chat"])
 
+    # Cache the models for future use
+    set_cached_models(models)
+    set_model_catalog(catalog, time.time())
+    logger.debug(f"Fetched {len(ids)} models, {len(models)} chat models")
     return models
 
 
@@ -0,0 +1,58 @@
+import functools
+import math
+from typing import Any, Dict, List, Optional
+
+# Tokens every chat message costs on top of its content
+MESSAGE_TOKENS = 4
+# Without tiktoken: BPE tokens average about 4 bytes of UTF-8 text, a little less for Cyrillic
+BYTES_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: Optional[str]) -> Any:
+    # tiktoken is optional (pip install tiktoken), the estimate is close enough for a budget
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model or "gpt-4o")
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count the tokens of a text locally, exactly with tiktoken or estimated without it.
+
+    Args:
+        text (str): The text.
+        model (Optional[str], optional): The model whose tokenizer is used. Defaults to None.
+
+    Returns:
+        int: The tokens.
+    """
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text.encode("utf-8")) / BYTES_PER_TOKEN)
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: Optional[str] = None) -> int:
+    """
+    Count the tokens of chat messages with text content.
+
+    Args:
+        messages (List[Dict[str, Any]]): The chat messages.
+        model (Optional[str], optional): The model whose tokenizer is used. Defaults to None.
+
+    Returns:
+        int: The tokens.
+    """
+    tokens: int = 0
+    for message in messages:
+        content = message["content"]
+        if not isinstance(content, str):
+            content = "".join(part.get("text", "") for part in content)
+        tokens += MESSAGE_TOKENS + count_tokens(content, model)
+    return tokens
@@ -1,16 +1,268 @@
-import httpx
+import asyncio
+import io
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from loguru import logger
+
+from utils.asr_pool import EndpointPool
+from utils.transport import MAX_RETRIES, arequest, get_async_openai_client, get_openai_client, request
+
+load_dotenv()
+
+# ASR backend: "http" (whisper-asr-webservice), "openai" (Whisper API) or "local" (faster-whisper on the CPU)
+ASR_BACKEND: str = os.getenv("ASR_BACKEND", "http").lower()
+
+# Comma-separated URLs of equivalent servers are used as a pool with failover and hedging
+ASR_URL: str = os.getenv("ASR_URL", "http://192.168.31.76:9000/asr")
+ASR_LANGUAGE: str = "uk"
+ASR_INITIAL_PROMPT: str = "Захист лабораторної роботи з математики"
+
+ASR_PARAMS = {
+    "language": ASR_LANGUAGE,
+    "initial_prompt": ASR_INITIAL_PROMPT,
+}
+
+OPENAI_ASR_MODEL: str = os.getenv("OPENAI_ASR_MODEL", "whisper-1")
+
+# The local model is loaded once and stays in memory, int8 keeps it fast on the CPU
+LOCAL_ASR_MODEL: str = os.getenv("LOCAL_ASR_MODEL", "small")
+LOCAL_ASR_DEVICE: str = os.getenv("LOCAL_ASR_DEVICE", "cpu")
+LOCAL_ASR_COMPUTE_TYPE: str = os.getenv("LOCAL_ASR_COMPUTE_TYPE", "int8")
+LOCAL_ASR_THREADS: int = int(os.getenv("LOCAL_ASR_THREADS", "0"))  # 0 uses every core
+LOCAL_ASR_BEAM_SIZE: int = int(os.getenv("LOCAL_ASR_BEAM_SIZE", "1"))
+
+
+class AsrBackend(ABC):
+    """
+    A speech recognizer. Audio is passed as the bytes of an encoded file (WAV, FLAC or Opus).
+    """
+
+    name: str = ""
+
+    @property
+    @abstractmethod
+    def cache_id(self) -> Tuple[Any, ...]:
+        """
+        What, besides the audio, the transcript depends on. Part of the transcription cache key.
+        """
+
+    def warm_up(self) -> None:
+        """
+        Prepare the backend so that the first transcription doesn't wait. Runs in a worker thread.
+        """
+
+    def connection_urls(self) -> List[str]:
+        """
+        Get the URLs whose connections are kept warm while recording, see awarm_connections.
+
+        Returns:
+            List[str]: The URLs, empty without network.
+        """
+        return []
+
+    @abstractmethod
+    def transcribe(self, audio: bytes, filename: str = "record.wav") -> str:
+        """
+        Transcribe audio.
+
+        Args:
+            audio (bytes): The encoded audio.
+            filename (str, optional): The file name, its extension tells the format. Defaults to "record.wav".
+
+        Returns:
+            str: The transcript.
+        """
+
+    async def atranscribe(self, audio: bytes, filename: str = "record.wav") -> str:
+        """
+        Transcribe audio without blocking the event loop. Takes the same arguments as transcribe.
+        """
+        return await asyncio.to_thread(self.transcribe, audio, filename)
+
+
+class HttpAsrBackend(AsrBackend):
+    """
+    One or more whisper-asr-webservice servers, see EndpointPool.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str = ASR_URL, params: Optional[Dict[str, str]] = None) -> None:
+        self.pool = EndpointPool([u.strip() for u in url.split(",") if u.strip()])
+        self.params: Dict[str, str] = params if params is not None else ASR_PARAMS
+        # With more than one server a failed request fails over instead of being retried
+        self.retries: int = MAX_RETRIES if len(self.pool.urls) == 1 else 0
+
+    @property
+    def cache_id(self) -> Tuple[Any, ...]:
+        # The same audio gives a different transcript on another server or with other parameters.
+        # The servers of a pool are equivalent.
+        urls: List[str] = self.pool.urls
+        return (urls[0] if len(urls) == 1 else sorted(urls)), self.params
+
+    def connection_urls(self) -> List[str]:
+        return self.pool.urls
+
+    def transcribe(self, audio: bytes, filename: str = "record.wav") -> str:
+        def call(url: str, timeout: float) -> str:
+            response = request(
+                "POST", url, retries=self.retries, timeout=timeout,
+                params=self.params, files={"audio_file": (filename, audio)},
+            )
+            response.raise_for_status()
+            return response.content.decode("utf-8")
+
+        return self.pool.run(call)
+
+    async def atranscribe(self, audio: bytes, filename: str = "record.wav") -> str:
+        async def call(url: str, timeout: float) -> str:
+            response = await arequest(
+                "POST", url, retries=self.retries, timeout=timeout,
+                params=self.params, files={"audio_file": (filename, audio)},
+            )
+            response.raise_for_status()
+            return response.content.decode("utf-8")
+
+        return await self.pool.arun(call)
+
+
+class OpenAIAsrBackend(AsrBackend):
+    """
+    The OpenAI transcription API, through the shared OpenAI clients.
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str = OPENAI_ASR_MODEL, params: Optional[Dict[str, str]] = None) -> None:
+        self.model: str = model
+        params = params if params is not None else ASR_PARAMS
+        self.options: Dict[str, str] = {"language": params["language"], "prompt": params["initial_prompt"]}
+
+    @property
+    def cache_id(self) -> Tuple[Any, ...]:
+        return self.name, self.model, self.options
+
+    def connection_urls(self) -> List[str]:
+        return [str(get_async_openai_client().base_url)]
+
+    def transcribe(self, audio: bytes, filename: str = "record.wav") -> str:
+        response = get_openai_client().audio.transcriptions.create(
+            model=self.model, file=(filename, audio), **self.options
+        )
+        return response.text
+
+    async def atranscribe(self, audio: bytes, filename: str = "record.wav") -> str:
+        response = await get_async_openai_client().audio.transcriptions.create(
+            model=self.model, file=(filename, audio), **self.options
+        )
+        return response.text
+
+
+class LocalAsrBackend(AsrBackend):
+    """
+    faster-whisper running in the process. No network, so it keeps working offline.
+    The model is loaded once by warm_up, or by the first transcription, and reused.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model: str = LOCAL_ASR_MODEL,
+        device: str = LOCAL_ASR_DEVICE,
+        compute_type: str = LOCAL_ASR_COMPUTE_TYPE,
+        params: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.model_name: str = model
+        self.device: str = device
+        self.compute_type: str = compute_type
+        self.params: Dict[str, str] = params if params is not None else ASR_PARAMS
+        self._model: Any = None
+        self._load_lock = threading.Lock()
+        # One transcription at a time, they already use every core
+        self._run_lock = threading.Lock()
+
+    @property
+    def cache_id(self) -> Tuple[Any, ...]:
+        return self.name, self.model_name, self.compute_type, LOCAL_ASR_BEAM_SIZE, self.params
+
+    def _get_model(self) -> Any:
+        with self._load_lock:
+            if self._model is None:
+                # Optional dependency: pip install faster-whisper
+                from faster_whisper import WhisperModel
+
+                logger.info(f"Loading ASR model {self.model_name} ({self.device}, {self.compute_type})...")
+                self._model = WhisperModel(
+                    self.model_name, device=self.device, compute_type=self.compute_type, cpu_threads=LOCAL_ASR_THREADS
+                )
+                logger.info(f"ASR model {self.model_name} loaded")
+            return self._model
+
+    def warm_up(self) -> None:
+        self._get_model()
+
+    def transcribe(self, audio: bytes, filename: str = "record.wav") -> str:
+        model = self._get_model()
+        with self._run_lock:
+            segments, _ = model.transcribe(
+                io.BytesIO(audio),
+                language=self.params["language"],
+                initial_prompt=self.params["initial_prompt"],
+                beam_size=LOCAL_ASR_BEAM_SIZE,
+            )
+            return "".join(segment.text for segment in segments).strip()
+
+
+ASR_BACKENDS = {
+    HttpAsrBackend.name: HttpAsrBackend,
+    OpenAIAsrBackend.name: OpenAIAsrBackend,
+    LocalAsrBackend.name: LocalAsrBackend,
+}
+
+_backend_lock = threading.Lock()
+_backend: Optional[AsrBackend] = None
+
+
+def get_asr_backend() -> AsrBackend:
+    """
+    Get the process-wide ASR backend selected by ASR_BACKEND.
+
+    Returns:
+        AsrBackend: The backend.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if ASR_BACKEND not in ASR_BACKENDS:
+                raise ValueError(f"Unknown ASR_BACKEND {ASR_BACKEND!r}, expected one of {', '.join(ASR_BACKENDS)}")
+            _backend = ASR_BACKENDS[ASR_BACKEND]()
+        return _backend
+
+
+def warm_up_asr() -> None:
+    """
+    Warm the ASR backend up, e.g. load the local model. Errors are logged, the first
+    transcription will raise them again.
+    """
+    try:
+        get_asr_backend().warm_up()
+    except Exception as e:
+        logger.error(f"Can't warm up the ASR backend: {e!r}")
+
+
+def transcribe_audio_bytes(audio: bytes, filename: str = "record.wav") -> str:
+    return get_asr_backend().transcribe(audio, filename)
+
+
+async def atranscribe_audio_bytes(audio: bytes, filename: str = "record.wav") -> str:
+    return await get_asr_backend().atranscribe(audio, filename)
+
 
 def transcribe_audio_from_file(file_path: str = "record.wav"):
     with open(file_path, "rb") as f:
-        audio = f.read()
-        response = httpx.post(
-            "http://192.168.31.76:9000/asr",
-            params={
-                "language": "uk",
-                "initial_prompt": "Захист лабораторної роботи з математики",
-            },
-            files={
-                "audio_file": audio,
-            }
-        )
-        return response.content.decode("utf-8")
\ No newline at end of file
+        return transcribe_audio_bytes(f.read(), os.path.basename(file_path))
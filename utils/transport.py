@@ -0,0 +1,223 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+import httpx
+from dotenv import load_dotenv
+from loguru import logger
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+load_dotenv()
+
+# Connection pool shared by every outbound request of the process
+MAX_CONNECTIONS = 10
+MAX_KEEPALIVE_CONNECTIONS = 5
+KEEPALIVE_EXPIRY = 120.0  # seconds
+
+CONNECT_TIMEOUT = 5.0  # seconds
+READ_TIMEOUT = 60.0  # seconds
+
+# Retries with exponential backoff and full jitter
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.25  # seconds
+BACKOFF_MAX = 4.0  # seconds
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+HTTP2 = os.getenv("HTTP2", "false").lower() in ("1", "true", "yes")
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_openai_client: Optional["OpenAI"] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_async_openai_client: Optional["AsyncOpenAI"] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _client_options() -> dict:
+    http2 = HTTP2 and _http2_available()
+    if HTTP2 and not http2:
+        logger.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+    return dict(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the process-wide HTTP client with keep-alive connection pooling.
+
+    Returns:
+        httpx.Client: The shared HTTP client.
+    """
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(**_client_options())
+        return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide async HTTP client. It must only be used from one event loop,
+    the analysis engine's.
+
+    Returns:
+        httpx.AsyncClient: The shared async HTTP client.
+    """
+    global _async_http_client
+    with _lock:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(**_client_options())
+        return _async_http_client
+
+
+def get_openai_client() -> "OpenAI":
+    """
+    Get the process-wide OpenAI client. It sends its requests through the shared HTTP client
+    and retries them with the SDK's own jittered backoff.
+
+    Returns:
+        OpenAI: The shared OpenAI client.
+    """
+    global _openai_client
+    # The SDK is slow to import, it is only loaded with the first client
+    from openai import OpenAI
+
+    http_client = get_http_client()
+    with _lock:
+        if _openai_client is None:
+            _openai_client = OpenAI(http_client=http_client, max_retries=MAX_RETRIES)
+        return _openai_client
+
+
+def get_async_openai_client() -> "AsyncOpenAI":
+    """
+    Get the process-wide async OpenAI client, sending its requests through the shared
+    async HTTP client.
+
+    Returns:
+        AsyncOpenAI: The shared async OpenAI client.
+    """
+    global _async_openai_client
+    from openai import AsyncOpenAI
+
+    http_client = get_async_http_client()
+    with _lock:
+        if _async_openai_client is None:
+            _async_openai_client = AsyncOpenAI(http_client=http_client, max_retries=MAX_RETRIES)
+        return _async_openai_client
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Get the delay before the next retry, exponential backoff with full jitter.
+
+    Args:
+        attempt (int): The number of the failed attempt, starting from 0.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def request(method: str, url: str, retries: int = MAX_RETRIES, **kwargs) -> httpx.Response:
+    """
+    Send a request through the shared HTTP client. Connection errors, timeouts and
+    retryable status codes are retried with jittered backoff.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The URL.
+        retries (int, optional): The retries after the first attempt. Defaults to MAX_RETRIES.
+        **kwargs: Passed to httpx.Client.request.
+
+    Returns:
+        httpx.Response: The response of the last attempt.
+    """
+    client = get_http_client()
+    for attempt in range(retries + 1):
+        try:
+            response = client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"{method} {url} failed: {e!r}, retrying...")
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return response
+            logger.warning(f"{method} {url} returned {response.status_code}, retrying...")
+        time.sleep(backoff_delay(attempt))
+
+
+async def arequest(method: str, url: str, retries: int = MAX_RETRIES, **kwargs) -> httpx.Response:
+    """
+    Send a request through the shared async HTTP client, retrying like request().
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The URL.
+        retries (int, optional): The retries after the first attempt. Defaults to MAX_RETRIES.
+        **kwargs: Passed to httpx.AsyncClient.request.
+
+    Returns:
+        httpx.Response: The response of the last attempt.
+    """
+    client = get_async_http_client()
+    for attempt in range(retries + 1):
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"{method} {url} failed: {e!r}, retrying...")
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return response
+            logger.warning(f"{method} {url} returned {response.status_code}, retrying...")
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+async def awarm_connections(urls: Iterable[str]) -> None:
+    """
+    Open keep-alive connections of the shared async HTTP client to the hosts of the URLs,
+    so that the next request skips DNS and the TLS handshake. Any response will do,
+    errors are only logged.
+
+    Args:
+        urls (Iterable[str]): The URLs, one request is sent per host.
+    """
+    client = get_async_http_client()
+    hosts: Dict[str, str] = {}
+    for url in urls:
+        hosts.setdefault(str(httpx.URL(url).copy_with(path="/", query=None)), url)
+
+    async def warm(url: str) -> None:
+        start: float = time.perf_counter()
+        try:
+            await client.request("HEAD", url)
+        except httpx.HTTPError as e:
+            logger.warning(f"Can't open a connection to {url}: {e!r}")
+            return
+        logger.debug(f"Connection to {url} warm in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    await asyncio.gather(*(warm(url) for url in hosts.values()))
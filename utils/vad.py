@@ -0,0 +1,110 @@
+import numpy as np
+
+# Analysis window of the detector
+WINDOW_MS = 20
+# A window is speech if its RMS energy is this many times above the noise floor
+ENERGY_RATIO = 3.0
+# Absolute RMS energy below which a window is always silence (float samples in [-1, 1])
+MIN_ENERGY = 1e-3
+# Absolute RMS energy above which a window is always speech, about -34 dBFS. Without it audio
+# whose loudness barely varies (continuous speech, compressed loopback audio, speech over steady
+# noise) would be its own noise floor and be classed as silence.
+SPEECH_ENERGY = 0.02
+# Quiet windows with this zero-crossing rate are kept as unvoiced speech (fricatives)
+ZCR_THRESHOLD = 0.25
+
+
+def speech_mask(audio: np.ndarray, samplerate: int, window_ms: int = WINDOW_MS) -> np.ndarray:
+    """
+    Detect speech in short windows using RMS energy and zero-crossing rate.
+
+    Args:
+        audio (np.ndarray): The audio data, (samples,) or (samples, channels).
+        samplerate (int): The sample rate.
+        window_ms (int, optional): The window length in milliseconds. Defaults to WINDOW_MS.
+
+    Returns:
+        np.ndarray: Boolean mask with one value per window, True for speech.
+    """
+    mono: np.ndarray = audio.mean(axis=1) if audio.ndim > 1 else audio
+    window: int = max(1, samplerate * window_ms // 1000)
+    count: int = len(mono) // window
+    if count == 0:
+        return np.zeros(0, dtype=bool)
+
+    frames: np.ndarray = mono[: count * window].reshape(count, window).astype(np.float32)
+    energy: np.ndarray = np.sqrt(np.mean(frames**2, axis=1))
+    signs: np.ndarray = np.signbit(frames)
+    zcr: np.ndarray = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+    # The quietest windows give the noise floor of the recording
+    threshold: float = min(max(float(np.percentile(energy, 10)) * ENERGY_RATIO, MIN_ENERGY), SPEECH_ENERGY)
+    voiced: np.ndarray = energy > threshold
+    unvoiced: np.ndarray = (energy > threshold / 2) & (zcr > ZCR_THRESHOLD)
+    return voiced | unvoiced
+
+
+def trim_silence(
+    audio: np.ndarray,
+    samplerate: int,
+    max_silence: float = 0.5,
+    padding: float = 0.15,
+    window_ms: int = WINDOW_MS,
+) -> np.ndarray:
+    """
+    Cut leading and trailing silence and shorten pauses longer than max_silence.
+
+    Args:
+        audio (np.ndarray): The audio data, (samples,) or (samples, channels).
+        samplerate (int): The sample rate.
+        max_silence (float, optional): Longest pause in seconds that is kept as is. Defaults to 0.5.
+        padding (float, optional): Silence in seconds kept around speech. Defaults to 0.15.
+        window_ms (int, optional): The window length in milliseconds. Defaults to WINDOW_MS.
+
+    Returns:
+        np.ndarray: The trimmed audio data. Empty if no speech was detected.
+    """
+    mask: np.ndarray = speech_mask(audio, samplerate, window_ms)
+    if not mask.any():
+        return audio[:0]
+
+    count: int = len(mask)
+    window: int = max(1, samplerate * window_ms // 1000)
+    pad: int = int(padding * 1000 / window_ms)
+    max_gap: int = int(max_silence * 1000 / window_ms)
+
+    # Dilate speech by the padding: a window is kept if there is speech within `pad` windows
+    cumsum: np.ndarray = np.concatenate(([0], np.cumsum(mask)))
+    index: np.ndarray = np.arange(count)
+    keep: np.ndarray = cumsum[np.minimum(index + pad + 1, count)] - cumsum[np.maximum(index - pad, 0)] > 0
+
+    # Keep short pauses between speech, they carry the rhythm of the question
+    edges: np.ndarray = np.diff(np.concatenate(([1], keep.astype(np.int8), [1])))
+    starts: np.ndarray = np.flatnonzero(edges == -1)
+    ends: np.ndarray = np.flatnonzero(edges == 1)
+    short: np.ndarray = (starts > 0) & (ends < count) & (ends - starts <= max_gap)
+    for start, end in zip(starts[short], ends[short]):
+        keep[start:end] = True
+
+    # Samples after the last full window follow the last window
+    samples: np.ndarray = np.repeat(keep, window)
+    samples = np.concatenate((samples, np.full(len(audio) - len(samples), keep[-1])))
+    return audio[samples]
+
+
+def trailing_silence(audio: np.ndarray, samplerate: int, window_ms: int = WINDOW_MS) -> float:
+    """
+    Measure the silence at the end of the audio, e.g. to detect a pause while recording.
+
+    Args:
+        audio (np.ndarray): The audio data, (samples,) or (samples, channels).
+        samplerate (int): The sample rate.
+        window_ms (int, optional): The window length in milliseconds. Defaults to WINDOW_MS.
+
+    Returns:
+        float: The silence in seconds, the whole duration if there is no speech.
+    """
+    mask: np.ndarray = speech_mask(audio, samplerate, window_ms)
+    if not mask.any():
+        return len(audio) / samplerate
+    return (len(mask) - 1 - int(np.flatnonzero(mask)[-1])) * window_ms / 1000